@@ -15,6 +15,7 @@ from dotenv import load_dotenv
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from model import engine, User, Transaction
+from rollup import apply_transactions
 
 # Load environment variables
 load_dotenv()
@@ -42,14 +43,14 @@ def add_sample_data():
                 "description": "Salary Deposit",
                 "amount": 50000.0,
                 "category": "Salary",
-                "date": datetime.now().strftime("%Y-%m-%d"),
+                "date": datetime.now().date(),
             },
             {
                 "type": "income",
                 "description": "Freelance Project",
                 "amount": 15000.0,
                 "category": "Freelance",
-                "date": (datetime.now() - timedelta(days=5)).strftime("%Y-%m-%d"),
+                "date": (datetime.now() - timedelta(days=5)).date(),
             },
             # Expense transactions
             {
@@ -57,51 +58,54 @@ def add_sample_data():
                 "description": "Grocery Shopping",
                 "amount": 2500.0,
                 "category": "Food",
-                "date": datetime.now().strftime("%Y-%m-%d"),
+                "date": datetime.now().date(),
             },
             {
                 "type": "expense",
                 "description": "Netflix Subscription",
                 "amount": 499.0,
                 "category": "Entertainment",
-                "date": (datetime.now() - timedelta(days=2)).strftime("%Y-%m-%d"),
+                "date": (datetime.now() - timedelta(days=2)).date(),
             },
             {
                 "type": "expense",
                 "description": "Electric Bill",
                 "amount": 1200.0,
                 "category": "Utilities",
-                "date": (datetime.now() - timedelta(days=3)).strftime("%Y-%m-%d"),
+                "date": (datetime.now() - timedelta(days=3)).date(),
             },
             {
                 "type": "expense",
                 "description": "Fuel",
                 "amount": 800.0,
                 "category": "Transport",
-                "date": (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%d"),
+                "date": (datetime.now() - timedelta(days=1)).date(),
             },
             {
                 "type": "expense",
                 "description": "Restaurant Dinner",
                 "amount": 1200.0,
                 "category": "Food",
-                "date": (datetime.now() - timedelta(days=4)).strftime("%Y-%m-%d"),
+                "date": (datetime.now() - timedelta(days=4)).date(),
             },
             {
                 "type": "expense",
                 "description": "Shopping - Clothes",
                 "amount": 3000.0,
                 "category": "Shopping",
-                "date": (datetime.now() - timedelta(days=6)).strftime("%Y-%m-%d"),
+                "date": (datetime.now() - timedelta(days=6)).date(),
             },
         ]
         # Add transactions to database
+        transactions = []
         for tx_data in sample_transactions:
             transaction = Transaction(
                 user_id=user.id,
                 **tx_data
             )
             db.add(transaction)
+            transactions.append(transaction)
+        apply_transactions(db, transactions)
         db.commit()
         print(f"Successfully added {len(sample_transactions)} sample transactions for user '{user.username}'!")
     except Exception as e:
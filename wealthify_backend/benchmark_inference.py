@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for single-row model inference.
+
+Times `model.predict(DMatrix)` against `CompiledPredictor.predict` on the
+same random rows for both shipped models, checks that every prediction
+is identical and reports latency percentiles in microseconds.
+
+Usage:
+    python benchmark_inference.py [--iterations 10000] [--seed 0]
+"""
+
+import argparse
+import sys
+import time
+import numpy as np
+import xgboost as xgb
+
+from inference import FeatureSpec, CompiledPredictor, _booster_and_range
+from ml_model import model_registry
+
+WARMUP_ITERATIONS = 200
+
+
+def _feature_names(booster: xgb.Booster):
+    return booster.feature_names or [f"f{i}" for i in range(booster.num_features())]
+
+
+def _time_calls(predict, rows):
+    for row in rows[:WARMUP_ITERATIONS]:
+        predict(row)
+    predictions = np.empty(len(rows), dtype=np.float32)
+    timings = np.empty(len(rows), dtype=np.float64)
+    for i, row in enumerate(rows):
+        start = time.perf_counter_ns()
+        predictions[i] = predict(row)
+        timings[i] = time.perf_counter_ns() - start
+    return predictions, timings / 1000.0
+
+
+def _report(label, timings):
+    p50, p99 = np.percentile(timings, [50, 99])
+    print(f"  {label:<10} mean {timings.mean():9.1f} us   p50 {p50:9.1f} us   p99 {p99:9.1f} us")
+
+
+def benchmark(name, model, iterations, rng) -> bool:
+    # sklearn estimators no longer accept a DMatrix, so time the Booster their predict() wraps
+    booster, iteration_range = _booster_and_range(model)
+    names = _feature_names(booster)
+    # float32 inputs so both paths see exactly the same values
+    rows = rng.uniform(0, 100000, size=(iterations, len(names))).astype(np.float32).tolist()
+    predictor = CompiledPredictor(model, FeatureSpec(names))
+
+    reference, reference_timings = _time_calls(
+        lambda row: booster.predict(xgb.DMatrix([row], feature_names=names), iteration_range=iteration_range)[0], rows
+    )
+    compiled, compiled_timings = _time_calls(predictor.predict, rows)
+
+    print(f"{name} ({len(names)} features, {iterations} rows)")
+    _report("DMatrix", reference_timings)
+    _report("compiled", compiled_timings)
+    mismatches = int(np.count_nonzero(reference != compiled))
+    print(f"  identical predictions: {'yes' if mismatches == 0 else f'NO ({mismatches} differ)'}")
+    return mismatches == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark single-row inference paths.")
+    parser.add_argument("--iterations", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    identical = True
+    for name in ("expense", "savings"):
+        loaded = model_registry.get(name)
+        identical &= benchmark(f"{name} ({loaded.version})", loaded.model, args.iterations, rng)
+    sys.exit(0 if identical else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+Per-user dashboard response cache.
+
+Entries hold the serialized dashboard body and its strong ETag. The
+default backend is an in-process LRU; set REDIS_URL to share entries
+between workers (requires the optional `redis` package). In-process
+entries are only invalidated in the worker that handled the write, so
+multi-worker deployments should use the shared backend.
+
+Writes mark users stale on the session with `mark_dashboard_stale`; once
+that session commits, the user's generation counter is bumped and the
+entry dropped. Readers note the generation before building a dashboard
+and entries are tagged with it, so a dashboard built from data read
+before the commit is never served afterwards, even if it is stored after
+the invalidation.
+"""
+
+import hashlib
+import itertools
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", 300))
+DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", 10000))
+
+
+class CacheBackend(ABC):
+    """Minimal byte-oriented key/value interface implemented by every backend."""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: int):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """Atomically advance an integer counter to a value it has never held and return it."""
+
+    @abstractmethod
+    def counter(self, key: str) -> int:
+        """The counter's current value."""
+
+
+class LRUBackend(CacheBackend):
+    """Thread-safe in-process LRU with per-entry expiry.
+
+    Counters share the entries' size bound. Their values come from one
+    process-wide sequence, so a counter evicted and recreated never
+    repeats a value it held before.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _store(self, key, expires_at, value):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._store(key, time.monotonic() + ttl, value)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            value = next(self._sequence)
+            self._store(key, float("inf"), value)
+            return value
+
+    def counter(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                value = next(self._sequence)
+                self._store(key, float("inf"), value)
+                return value
+            self._entries.move_to_end(key)
+            return entry[1]
+
+
+class RedisBackend(CacheBackend):
+    """Shared backend so every worker sees the same entries and invalidations."""
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("REDIS_URL is set but the 'redis' package is not installed")
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value, ttl):
+        self._client.set(key, value, ex=ttl)
+
+    def delete(self, key):
+        self._client.delete(key)
+
+    def incr(self, key):
+        return self._client.incr(key)
+
+    def counter(self, key):
+        return int(self._client.get(key) or 0)
+
+
+def backend_from_env() -> CacheBackend:
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        return RedisBackend(redis_url)
+    return LRUBackend(DASHBOARD_CACHE_SIZE)
+
+
+class DashboardCache:
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(user_id: int) -> str:
+        # The month is part of the key so entries roll over with the dashboard's "current month"
+        return f"dashboard:{user_id}:{datetime.now().strftime('%Y-%m')}"
+
+    @staticmethod
+    def _generation_key(user_id: int) -> str:
+        return f"dashboard-generation:{user_id}"
+
+    def generation(self, user_id: int) -> int:
+        """The user's current generation; read it before building a dashboard to cache."""
+        return self.backend.counter(self._generation_key(user_id))
+
+    def get(self, user_id: int, generation: int):
+        """Return (etag, body) for a dashboard cached at `generation`, or None."""
+        value = self.backend.get(self._key(user_id))
+        if value is None:
+            return None
+        cached_generation, etag, body = value.split(b"\n", 2)
+        if int(cached_generation) != generation:
+            return None
+        return etag.decode(), body
+
+    def put(self, user_id: int, body: bytes, generation: int) -> str:
+        """Cache a dashboard built at `generation` and return its strong ETag.
+
+        Nothing is stored if the user was invalidated since `generation` was read.
+        """
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        if self.generation(user_id) == generation:
+            value = f"{generation}\n{etag}\n".encode() + body
+            self.backend.set(self._key(user_id), value, self.ttl)
+        return etag
+
+    def invalidate(self, user_id: int):
+        self.backend.incr(self._generation_key(user_id))
+        self.backend.delete(self._key(user_id))
+
+
+dashboard_cache = DashboardCache(backend_from_env(), DASHBOARD_CACHE_TTL)
+
+
+def mark_dashboard_stale(db: Session, user_id: int):
+    """Invalidate a user's cached dashboard once `db` commits."""
+    db.info.setdefault("stale_dashboards", set()).add(int(user_id))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    for user_id in session.info.pop("stale_dashboards", ()):
+        dashboard_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session):
+    session.info.pop("stale_dashboards", None)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+One-time conversion of the legacy model artifacts to checksummed UBJSON.
+
+Writes `<stem>.ubj` and `<stem>.ubj.sha256` next to each legacy artifact
+(expense_model.json, budget_model.pkl), which the model registry then
+loads instead of the originals. With --version the converted boosters
+are also published as that registry version. Every converted model is
+checked to predict exactly like the original before anything is written.
+
+The pickle is unpickled once here, so run this only on the trusted file
+shipped with the repo, with the XGBoost version that produced it.
+
+Usage:
+    python convert_models.py [--version V] [--registry-dir DIR]
+"""
+
+import argparse
+import os
+import pickle
+import numpy as np
+import xgboost as xgb
+
+from inference import _booster_and_range
+from model_registry import (
+    BASE_DIR,
+    LEGACY_ARTIFACTS,
+    MODEL_REGISTRY_DIR,
+    publish_version,
+    write_checksum,
+)
+
+CHECK_ROWS = 1000
+
+
+def _load_original(path: str):
+    if path.endswith(".pkl"):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    booster = xgb.Booster()
+    booster.load_model(path)
+    return booster
+
+
+def _as_booster(model) -> xgb.Booster:
+    """The booster that predicts like `model`, trimmed to the best iteration of early-stopped estimators."""
+    booster, (begin, end) = _booster_and_range(model)
+    return booster[begin:end] if end else booster
+
+
+def _check_identical(original, converted: xgb.Booster):
+    rows = np.random.default_rng(0).uniform(0, 100000, size=(CHECK_ROWS, converted.num_features())).astype(np.float32)
+    rows[::7, 0] = np.nan
+    # sklearn estimators reject a DMatrix, so compare against the Booster their predict() wraps
+    booster, iteration_range = _booster_and_range(original)
+    expected = booster.inplace_predict(rows, iteration_range=iteration_range)
+    actual = converted.inplace_predict(rows)
+    if not np.array_equal(expected, actual):
+        raise ValueError("Converted model does not reproduce the original predictions")
+
+
+def convert(artifact: str):
+    """Convert one legacy artifact; returns the converted booster and its .ubj path."""
+    source = os.path.join(BASE_DIR, artifact)
+    original = _load_original(source)
+    booster = _as_booster(original)
+    target = os.path.splitext(source)[0] + ".ubj"
+    tmp_target = target + ".tmp"
+    try:
+        booster.save_model(tmp_target)
+        converted = xgb.Booster()
+        converted.load_model(tmp_target)
+        _check_identical(original, converted)
+        # Drop any old checksum before replacing the file and write the new one last: if this is
+        # interrupted, the registry finds a .ubj without a checksum and falls back to the original.
+        if os.path.exists(target + ".sha256"):
+            os.remove(target + ".sha256")
+        os.replace(tmp_target, target)
+    finally:
+        if os.path.exists(tmp_target):
+            os.remove(tmp_target)
+    write_checksum(target)
+    return converted, target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert legacy model artifacts to checksummed UBJSON.")
+    parser.add_argument("--version", default=None, help="Also publish the converted models as this registry version")
+    parser.add_argument("--registry-dir", default=MODEL_REGISTRY_DIR)
+    args = parser.parse_args()
+
+    for name, artifact in LEGACY_ARTIFACTS.items():
+        booster, target = convert(artifact)
+        print(f"{artifact} -> {os.path.basename(target)} ({os.path.getsize(target)} bytes)")
+        if args.version:
+            version_dir = publish_version(args.registry_dir, name, args.version, booster, source=artifact)
+            print(f"  published as {name} {args.version} in {version_dir}")
+
+
+if __name__ == "__main__":
+    main()
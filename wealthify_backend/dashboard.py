@@ -0,0 +1,111 @@
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import and_, case, func
+from sqlalchemy.orm import Session
+
+from model import User, Transaction, TransactionRollup, LedgerSummary
+from schema import DashboardData, FinancialSummary, SpendingCategory, TransactionResponse
+from dates import month_keys
+
+
+def _sum_if(*conditions):
+    # SUM(CASE WHEN ... THEN total_amount ELSE 0 END) - one column of the single-pass aggregate
+    return func.coalesce(func.sum(case((and_(*conditions), TransactionRollup.total_amount), else_=0.0)), 0.0)
+
+
+def _count_if(*conditions):
+    return func.coalesce(func.sum(case((and_(*conditions), TransactionRollup.tx_count), else_=0)), 0)
+
+
+def aggregate_transactions(user_id: int, current_month: str, last_month: str, db: Session):
+    """Compute the monthly dashboard figures in one conditional-aggregation pass.
+
+    Reads only the user's rollup rows for the current and last month
+    (one per type and category), grouped by category; each row carries
+    both months' sums so totals and the spending breakdown come from the
+    same result. Lifetime totals come from the ledger summary instead.
+    """
+    is_income = TransactionRollup.type == "income"
+    is_expense = TransactionRollup.type == "expense"
+    in_current = TransactionRollup.month == current_month
+    in_last = TransactionRollup.month == last_month
+
+    rows = db.query(
+        TransactionRollup.category,
+        _sum_if(is_income, in_current).label("monthly_income"),
+        _sum_if(is_expense, in_current).label("monthly_expenses"),
+        _count_if(is_expense, in_current).label("monthly_expense_count"),
+        _sum_if(is_income, in_last).label("last_month_income"),
+        _sum_if(is_expense, in_last).label("last_month_expenses"),
+    ).filter(
+        TransactionRollup.user_id == user_id,
+        TransactionRollup.month.in_([current_month, last_month])
+    ).group_by(TransactionRollup.category).all()
+
+    totals = {
+        "monthly_income": 0.0,
+        "monthly_expenses": 0.0,
+        "last_month_income": 0.0,
+        "last_month_expenses": 0.0,
+    }
+    categories = []
+    for row in rows:
+        for key in totals:
+            totals[key] += float(getattr(row, key))
+        if row.monthly_expense_count:
+            categories.append((row.category, float(row.monthly_expenses)))
+    return totals, categories
+
+
+def build_spending_categories(categories):
+    total_category_expenses = sum(amount for _, amount in categories)
+    spending_categories = []
+    for category, amount in categories:
+        percentage = (amount / total_category_expenses * 100) if total_category_expenses > 0 else 0
+        spending_categories.append(SpendingCategory(
+            category=category,
+            amount=amount,
+            percentage=round(percentage, 1)
+        ))
+    return spending_categories
+
+
+def build_dashboard(user_id: int, db: Session) -> DashboardData:
+    """Assemble the dashboard response for a user."""
+    # User and lifetime ledger totals in one primary-key read
+    found = db.query(User, LedgerSummary).outerjoin(
+        LedgerSummary, LedgerSummary.user_id == User.id
+    ).filter(User.id == user_id).first()
+    if not found:
+        raise HTTPException(status_code=404, detail="User not found")
+    user, ledger = found
+
+    current_month, last_month = month_keys(datetime.now())
+    totals, categories = aggregate_transactions(user_id, current_month, last_month, db)
+
+    recent_transactions = db.query(Transaction).filter(
+        Transaction.user_id == user_id
+    ).order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(5).all()
+
+    total_balance = float(ledger.balance) if ledger else 0.0
+    last_month_balance = totals["last_month_income"] - totals["last_month_expenses"]
+    # Use user's savings_goal from DB
+    savings_goal = user.savings_goal if user.savings_goal is not None else 10000.0
+    current_savings = max(0, total_balance * 0.2)  # 20% of balance as savings
+
+    summary = FinancialSummary(
+        total_balance=total_balance,
+        monthly_income=totals["monthly_income"],
+        monthly_expenses=totals["monthly_expenses"],
+        savings_goal=savings_goal,
+        current_savings=current_savings,
+        last_month_balance=last_month_balance,
+        last_month_income=totals["last_month_income"],
+        last_month_expenses=totals["last_month_expenses"]
+    )
+
+    return DashboardData(
+        summary=summary,
+        recent_transactions=[TransactionResponse(**transaction.__dict__) for transaction in recent_transactions],
+        spending_categories=build_spending_categories(categories)
+    )
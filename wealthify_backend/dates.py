@@ -0,0 +1,49 @@
+from datetime import date, datetime, timedelta
+
+# Accepted spellings of a month key, e.g. "Apr-2024", "April-2024", "2024-04"
+MONTH_FORMATS = ("%b-%Y", "%B-%Y", "%Y-%m")
+
+
+def parse_month(month: str) -> date:
+    """Normalize a month key to the first day of that month; raises ValueError if unparseable."""
+    for fmt in MONTH_FORMATS:
+        try:
+            return datetime.strptime(month.strip(), fmt).date().replace(day=1)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognized month '{month}', expected e.g. Apr-2024")
+
+
+def month_keys(now: datetime):
+    """Return the "YYYY-MM" keys for the current and the previous month."""
+    current_month = now.strftime("%Y-%m")
+    last_month_date = now.replace(day=1) - timedelta(days=1)
+    return current_month, last_month_date.strftime("%Y-%m")
+
+
+def month_bounds(month: str):
+    """Return the [start, end) dates of a "YYYY-MM" month for index range scans."""
+    start = datetime.strptime(month, "%Y-%m").date()
+    if start.month == 12:
+        end = date(start.year + 1, 1, 1)
+    else:
+        end = date(start.year, start.month + 1, 1)
+    return start, end
+
+
+# Granularities a timestamp can be truncated to, as understood by PostgreSQL's date_trunc
+PERIOD_UNITS = ("hour", "day", "week", "month")
+
+
+def period_start(moment: datetime, unit: str) -> datetime:
+    """Truncate a timestamp to the start of its hour, day, ISO week (Monday) or month."""
+    if unit == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit == "day":
+        return start
+    if unit == "week":
+        return start - timedelta(days=start.weekday())
+    if unit == "month":
+        return start.replace(day=1)
+    raise ValueError(f"Unknown period '{unit}', expected one of {', '.join(PERIOD_UNITS)}")
@@ -0,0 +1,55 @@
+import csv
+import io
+from sqlalchemy.orm import Session
+
+# NULL marker for COPY, so empty strings stay empty strings
+COPY_NULL = r"\N"
+
+
+def dialect_insert(db: Session):
+    """Return the INSERT construct of the bound dialect so callers can use ON CONFLICT upserts."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported for the '{dialect}' dialect")
+    return insert
+
+
+def chunked(items, size: int):
+    """Yield successive lists of at most `size` items."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def is_postgres(db: Session) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def copy_rows(db: Session, table: str, columns, rows):
+    """Stream rows into `table` with PostgreSQL COPY on the session's own connection.
+
+    Runs inside the session's transaction, so the copied rows are committed
+    or rolled back together with the rest of the unit of work.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([COPY_NULL if row[column] is None else row[column] for column in columns])
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')",
+            buffer,
+        )
+    finally:
+        cursor.close()
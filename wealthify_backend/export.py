@@ -0,0 +1,63 @@
+"""
+Streaming NDJSON / CSV export of expenses.
+
+Rows are read through a server-side cursor (`yield_per`) and written out
+in chunks as they arrive, so memory stays bounded regardless of table size.
+"""
+
+import csv
+import io
+import json
+
+from model import SessionLocal, Expense
+
+STREAM_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    "id", "user_id", "month", "rent", "loan_repayment", "insurance", "groceries", "transport",
+    "eating_out", "entertainment", "utilities", "healthcare", "education", "miscellaneous", "total_expense",
+]
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _encode_ndjson(rows):
+    return "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in rows)
+
+
+def _encode_csv(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def stream_expenses(fmt: str, user_id=None, month_start=None):
+    """Yield encoded chunks of expenses, optionally filtered by user and month.
+
+    Opens its own session because the generator outlives the request's
+    dependency-managed one.
+    """
+    encode = _encode_csv if fmt == "csv" else _encode_ndjson
+    db = SessionLocal()
+    try:
+        query = db.query(*[getattr(Expense, column) for column in EXPORT_COLUMNS])
+        if user_id is not None:
+            query = query.filter(Expense.user_id == user_id)
+        if month_start is not None:
+            query = query.filter(Expense.month_start == month_start)
+        query = query.order_by(Expense.id).yield_per(STREAM_BATCH_SIZE)
+
+        if fmt == "csv":
+            yield _encode_csv([EXPORT_COLUMNS])
+        batch = []
+        for row in query:
+            batch.append(tuple(row))
+            if len(batch) >= STREAM_BATCH_SIZE:
+                yield encode(batch)
+                batch = []
+        if batch:
+            yield encode(batch)
+    finally:
+        db.close()
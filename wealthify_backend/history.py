@@ -0,0 +1,72 @@
+"""
+Portfolio history downsampling.
+
+Snapshots can be returned raw or bucketed into daily, weekly or monthly
+OHLC candles (timestamped at the bucket start, with `value` as the
+close). Either series can then be thinned to at most `max_points` with
+Largest-Triangle-Three-Buckets, which keeps the visual shape of a chart
+while dropping points that would not be seen.
+"""
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from model import PortfolioSnapshot
+
+# pandas period aliases for each bucketed resolution
+RESOLUTION_PERIODS = {"daily": "D", "weekly": "W", "monthly": "M"}
+RESOLUTIONS = ["raw"] + list(RESOLUTION_PERIODS)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points Largest-Triangle-Three-Buckets keeps out of (x, y)."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    # Interior points split into threshold - 2 buckets; one point is kept per bucket
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        areas = np.abs(
+            (x[previous] - avg_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas))
+        keep[i + 1] = previous
+    return keep
+
+
+def bucket_ohlc(frame: pd.DataFrame, resolution: str) -> pd.DataFrame:
+    """Collapse a time-ordered (timestamp, value) frame into OHLC rows per bucket."""
+    buckets = frame["timestamp"].dt.to_period(RESOLUTION_PERIODS[resolution]).dt.start_time
+    ohlc = frame.groupby(buckets, sort=True)["value"].agg(["first", "max", "min", "last"])
+    ohlc.columns = ["open", "high", "low", "close"]
+    ohlc.index.name = "timestamp"
+    ohlc = ohlc.reset_index()
+    ohlc["value"] = ohlc["close"]
+    return ohlc
+
+
+def load_history(db: Session, user_id: int, resolution: str = "raw", max_points=None):
+    """Return a user's portfolio history as a list of point dicts."""
+    rows = db.query(PortfolioSnapshot.timestamp, PortfolioSnapshot.value).filter(
+        PortfolioSnapshot.user_id == user_id
+    ).order_by(PortfolioSnapshot.timestamp, PortfolioSnapshot.id).all()
+    if not rows:
+        return []
+    frame = pd.DataFrame(rows, columns=["timestamp", "value"])
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"])
+    frame["value"] = frame["value"].astype(float).fillna(0.0)
+    if resolution != "raw":
+        frame = bucket_ohlc(frame, resolution)
+    if max_points is not None and len(frame) > max_points:
+        x = frame["timestamp"].astype("int64").to_numpy(dtype=np.float64)
+        frame = frame.iloc[lttb_indices(x, frame["value"].to_numpy(), max_points)]
+    return frame.to_dict("records")
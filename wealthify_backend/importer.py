@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Streaming CSV importer for expenses and bank-statement transactions.
+
+Files are parsed in fixed-size chunks with pandas, so memory stays flat
+regardless of file size. Each chunk goes through the bulk write path in
+ingest.py and is committed on its own.
+
+Layouts:
+    expenses      - the sample.csv columns (user_id, month, rent, ..., total_expense)
+    transactions  - user_id, type, description, amount, category, date (YYYY-MM-DD)
+
+The user_id column is optional when a default user id is given.
+
+Usage:
+    python importer.py expenses sample.csv
+    python importer.py transactions statement.csv --user-id 3
+"""
+
+import argparse
+import pandas as pd
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from model import SessionLocal
+from schema import ExpenseCreate
+from ingest import (
+    EXPENSE_UPDATE_COLUMNS,
+    TRANSACTION_COLUMNS,
+    validate_expenses,
+    upsert_expenses,
+    validate_transactions,
+    insert_transactions,
+)
+
+DEFAULT_CHUNK_SIZE = 5000
+# Rejected rows beyond this are counted but not listed
+MAX_REPORTED_ERRORS = 100
+
+LAYOUTS = {
+    "expenses": ["user_id"] + EXPENSE_UPDATE_COLUMNS,
+    "transactions": TRANSACTION_COLUMNS,
+}
+
+
+def _import_expense_chunk(db: Session, records):
+    expenses, errors, positions = [], [], []
+    for index, record in enumerate(records):
+        try:
+            expenses.append(ExpenseCreate(**record))
+            positions.append(index)
+        except ValidationError as e:
+            error = e.errors()[0]
+            field = ".".join(str(part) for part in error["loc"])
+            errors.append({"index": index, "detail": f"{field}: {error['msg']}"})
+    rows, rejected = validate_expenses(db, expenses)
+    # validate_expenses indexes into the parsed subset; map back to chunk positions
+    errors += [{"index": positions[error["index"]], "detail": error["detail"]} for error in rejected]
+    return upsert_expenses(db, rows), errors
+
+
+def _import_transaction_chunk(db: Session, records):
+    rows, errors = validate_transactions(db, records)
+    return insert_transactions(db, rows), errors
+
+
+CHUNK_IMPORTERS = {
+    "expenses": _import_expense_chunk,
+    "transactions": _import_transaction_chunk,
+}
+
+
+def _read_chunks(source, chunk_size: int):
+    # Everything is read as text; the write path does the type validation.
+    reader = pd.read_csv(source, chunksize=chunk_size, dtype=str, encoding="utf-8-sig", skipinitialspace=True)
+    try:
+        for chunk in reader:
+            chunk.columns = [column.strip().lower() for column in chunk.columns]
+            yield chunk
+    except (pd.errors.ParserError, UnicodeDecodeError) as e:
+        raise ValueError(f"Malformed CSV: {e}")
+
+
+def import_csv(db: Session, source, kind: str, default_user_id=None, chunk_size: int = DEFAULT_CHUNK_SIZE, on_progress=None):
+    """Import a CSV file object or path chunk by chunk; returns a summary dict.
+
+    `on_progress` is called with the running summary after every committed chunk.
+    Row indexes in errors are 0-based positions among the file's data rows.
+
+    Chunks are committed as they go and are not rolled back. If the file turns
+    out to be malformed or a chunk lacks a required column, the import stops
+    there and the summary is returned with `error` set; its counts cover the
+    chunks already written.
+    """
+    if kind not in LAYOUTS:
+        raise ValueError(f"Unknown import layout '{kind}', expected one of {sorted(LAYOUTS)}")
+    summary = {"kind": kind, "batches": 0, "rows_read": 0, "written": 0, "rejected": 0, "errors": [], "error": None}
+    try:
+        _import_chunks(db, source, kind, default_user_id, chunk_size, summary, on_progress)
+    except ValueError as e:
+        summary["error"] = str(e)
+    return summary
+
+
+def _import_chunks(db: Session, source, kind: str, default_user_id, chunk_size: int, summary, on_progress):
+    import_chunk = CHUNK_IMPORTERS[kind]
+    for chunk in _read_chunks(source, chunk_size):
+        if "user_id" not in chunk.columns and default_user_id is not None:
+            chunk["user_id"] = default_user_id
+        missing = [column for column in LAYOUTS[kind] if column not in chunk.columns]
+        if missing:
+            raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+        layout = chunk[LAYOUTS[kind]]
+        records = layout.astype(object).where(layout.notna(), None).to_dict("records")
+
+        try:
+            written, errors = import_chunk(db, records)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        offset = summary["rows_read"]
+        summary["batches"] += 1
+        summary["rows_read"] += len(records)
+        summary["written"] += written
+        summary["rejected"] += len(errors)
+        room = MAX_REPORTED_ERRORS - len(summary["errors"])
+        summary["errors"] += [
+            {"index": offset + error["index"], "detail": error["detail"]} for error in errors[:room]
+        ]
+        if on_progress:
+            on_progress(summary)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import expenses or transactions from a CSV file.")
+    parser.add_argument("kind", choices=sorted(LAYOUTS))
+    parser.add_argument("path")
+    parser.add_argument("--user-id", type=int, default=None, help="user id for rows without a user_id column")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    def report(summary):
+        print(
+            f"batch {summary['batches']}: {summary['rows_read']} rows read, "
+            f"{summary['written']} written, {summary['rejected']} rejected"
+        )
+
+    db = SessionLocal()
+    try:
+        summary = import_csv(db, args.path, args.kind, args.user_id, args.chunk_size, on_progress=report)
+    finally:
+        db.close()
+    for error in summary["errors"]:
+        print(f"row {error['index']}: {error['detail']}")
+    print(f"Imported {summary['written']} of {summary['rows_read']} rows.")
+    if summary["error"]:
+        raise SystemExit(f"Import stopped after {summary['batches']} batches: {summary['error']}")
+
+
+if __name__ == "__main__":
+    main()
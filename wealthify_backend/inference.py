@@ -0,0 +1,245 @@
+"""
+Low-latency XGBoost inference.
+
+Building a DMatrix (and its feature names) costs more than walking the
+trees for a single row. A CompiledPredictor instead writes features
+into a preallocated float32 buffer described by a fixed FeatureSpec and
+evaluates it with the trees compiled into flat NumPy arrays: all trees
+advance one level per step, split tests and leaf sums use float32 like
+XGBoost's CPU predictor. Models the compiler does not cover (other
+objectives, categorical splits, multi-output) and models that fail the
+self-check against `inplace_predict` use `inplace_predict` directly.
+Buffers are per thread, so one predictor can serve concurrent requests.
+
+Prediction work (feature queries plus model calls) runs on a dedicated,
+bounded thread pool rather than the event loop. Submissions beyond
+INFERENCE_MAX_PENDING are rejected immediately and callers stop waiting
+after a timeout, so a burst of predictions cannot stall other requests.
+"""
+
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import xgboost as xgb
+
+# Objectives whose prediction is the raw margin, so leaf sums can be returned as-is
+IDENTITY_OBJECTIVES = {"reg:squarederror", "reg:absoluteerror", "reg:pseudohubererror"}
+SELF_CHECK_ROWS = 256
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 2))
+# Threads XGBoost itself may use per prediction call
+INFERENCE_NTHREAD = int(os.getenv("INFERENCE_NTHREAD", 1))
+# Predictions queued or running at once before new ones are rejected
+INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", 32))
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", 5))
+INFERENCE_BATCH_TIMEOUT = float(os.getenv("INFERENCE_BATCH_TIMEOUT", 60))
+
+
+class FeatureSpec:
+    """Fixed, ordered feature layout of a model input row."""
+
+    def __init__(self, names):
+        self.names = tuple(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self.names)
+
+    def buffer(self) -> np.ndarray:
+        """This thread's (1, n_features) float32 row buffer, allocated once."""
+        row = getattr(self._local, "row", None)
+        if row is None:
+            row = self._local.row = np.empty((1, len(self.names)), dtype=np.float32)
+        return row
+
+    def fill(self, values) -> np.ndarray:
+        """Copy one row of values (None means missing) into the buffer and return it."""
+        row = self.buffer()
+        if len(values) != len(self.names):
+            raise ValueError(f"Expected {len(self.names)} features, got {len(values)}")
+        for i, value in enumerate(values):
+            row[0, i] = np.nan if value is None else value
+        return row
+
+    def matrix(self, rows) -> np.ndarray:
+        """Stack many rows into a float32 matrix in this layout."""
+        matrix = np.array([[np.nan if value is None else value for value in row] for row in rows], dtype=np.float32)
+        return matrix.reshape(len(matrix), len(self.names))
+
+
+def _booster_and_range(model):
+    """The Booster behind a Booster or sklearn estimator, with the iteration range its predict() uses."""
+    if isinstance(model, xgb.Booster):
+        return model, (0, 0)
+    booster = model.get_booster()
+    try:
+        return booster, (0, model.best_iteration + 1)
+    except AttributeError:
+        return booster, (0, 0)
+
+
+class TreeEnsemble:
+    """A single-output tree ensemble flattened into arrays for one-row evaluation."""
+
+    def __init__(self, roots, left, right, feature, threshold, default_left, leaf_value, base_score, depth):
+        self.roots = roots
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.default_left = default_left
+        self.leaf_value = leaf_value
+        self.base_score = base_score
+        self.depth = depth
+
+    @classmethod
+    def compile(cls, booster: xgb.Booster, iteration_range=(0, 0)):
+        """Flatten a booster's trees, or return None if the model is not supported."""
+        learner = json.loads(booster.save_raw("json"))["learner"]
+        params = learner["learner_model_param"]
+        gbm = learner["gradient_booster"]
+        if (
+            learner["objective"]["name"] not in IDENTITY_OBJECTIVES
+            or gbm["name"] != "gbtree"
+            or int(params.get("num_class", 0)) > 1
+            or int(params.get("num_target", 1)) > 1
+        ):
+            return None
+        trees = gbm["model"]["trees"]
+        begin, end = iteration_range
+        if end > 0:
+            indptr = gbm["model"].get("iteration_indptr")
+            if not indptr:
+                return None
+            trees = trees[indptr[begin]:indptr[end]]
+        left, right, feature, threshold, default_left, roots = [], [], [], [], [], []
+        depth = offset = 0
+        for tree in trees:
+            if any(tree["split_type"]) or int(tree["tree_param"].get("size_leaf_vector", 0)) > 1:
+                return None
+            roots.append(offset)
+            children_left = np.asarray(tree["left_children"], dtype=np.int64)
+            children_right = np.asarray(tree["right_children"], dtype=np.int64)
+            nodes = np.arange(offset, offset + len(children_left))
+            is_leaf = children_left == -1
+            # Leaves point at themselves so every tree can take the same number of steps
+            left.append(np.where(is_leaf, nodes, children_left + offset))
+            right.append(np.where(is_leaf, nodes, children_right + offset))
+            feature.append(np.where(is_leaf, 0, tree["split_indices"]))
+            threshold.append(tree["split_conditions"])
+            default_left.append(np.asarray(tree["default_left"], dtype=bool))
+            depth = max(depth, _tree_depth(children_left, children_right))
+            offset += len(children_left)
+        if not roots:
+            return None
+        split_conditions = np.concatenate(threshold).astype(np.float32)
+        base_score = np.float32(str(params["base_score"]).strip("[]").split(",")[0])
+        return cls(
+            np.asarray(roots, dtype=np.int64),
+            np.concatenate(left),
+            np.concatenate(right),
+            np.concatenate(feature).astype(np.int64),
+            split_conditions,
+            np.concatenate(default_left),
+            split_conditions,  # a leaf's split condition holds its value
+            base_score,
+            depth,
+        )
+
+    def predict_row(self, row: np.ndarray) -> np.float32:
+        node = self.roots
+        for _ in range(self.depth):
+            value = row[self.feature[node]]
+            go_left = np.where(np.isnan(value), self.default_left[node], value < self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        # cumsum adds sequentially (unlike sum's pairwise reduction), matching XGBoost's float32 order
+        terms = np.empty(len(node) + 1, dtype=np.float32)
+        terms[0] = self.base_score
+        np.take(self.leaf_value, node, out=terms[1:])
+        return np.cumsum(terms, dtype=np.float32)[-1]
+
+
+def _tree_depth(children_left, children_right) -> int:
+    depth, level = 0, [0]
+    while True:
+        level = [child for node in level for child in (children_left[node], children_right[node]) if child != -1]
+        if not level:
+            return depth
+        depth += 1
+
+
+class CompiledPredictor:
+    def __init__(self, model, spec: FeatureSpec):
+        self.booster, self.iteration_range = _booster_and_range(model)
+        self.booster.set_param({"nthread": INFERENCE_NTHREAD})
+        self.spec = spec
+        self.ensemble = None
+        if len(spec) == self.booster.num_features():
+            ensemble = TreeEnsemble.compile(self.booster, self.iteration_range)
+            if ensemble is not None and self._agrees(ensemble):
+                self.ensemble = ensemble
+
+    def _agrees(self, ensemble: TreeEnsemble) -> bool:
+        """Check the compiled trees reproduce inplace_predict exactly, including missing values."""
+        rng = np.random.default_rng(0)
+        rows = rng.normal(0, 1, size=(SELF_CHECK_ROWS, len(self.spec))).astype(np.float32)
+        rows *= np.float32(10.0) ** rng.integers(0, 6, size=rows.shape).astype(np.float32)
+        rows[rng.random(rows.shape) < 0.1] = np.nan
+        # Thresholds themselves are the values most likely to expose a wrong comparison
+        for i, j in enumerate(rng.integers(0, len(ensemble.threshold), size=SELF_CHECK_ROWS)):
+            rows[i, ensemble.feature[j]] = ensemble.threshold[j]
+        expected = self.booster.inplace_predict(rows, iteration_range=self.iteration_range)
+        return all(ensemble.predict_row(row) == want for row, want in zip(rows, expected))
+
+    def predict(self, values) -> np.float32:
+        """Predict one row given its feature values in spec order."""
+        row = self.spec.fill(values)
+        if self.ensemble is not None:
+            return self.ensemble.predict_row(row[0])
+        return self.booster.inplace_predict(row, iteration_range=self.iteration_range)[0]
+
+    def predict_many(self, rows) -> np.ndarray:
+        """Predict many rows in one call."""
+        return self.booster.inplace_predict(self.spec.matrix(rows), iteration_range=self.iteration_range)
+
+
+class InferenceOverloaded(Exception):
+    """Too many predictions are already queued or running."""
+
+
+class InferenceTimeout(Exception):
+    """A prediction did not finish within its timeout."""
+
+
+class InferenceExecutor:
+    def __init__(self, workers: int, max_pending: int):
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _finished(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn, *args, timeout: float = INFERENCE_TIMEOUT):
+        """Run fn(*args) on the inference pool and await its result."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise InferenceOverloaded()
+            self._pending += 1
+        future = self._pool.submit(fn, *args)
+        # Released when the work really ends (or is cancelled before starting), not when we stop waiting
+        future.add_done_callback(self._finished)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise InferenceTimeout()
+
+
+inference_executor = InferenceExecutor(INFERENCE_WORKERS, INFERENCE_MAX_PENDING)
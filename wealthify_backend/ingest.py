@@ -0,0 +1,185 @@
+"""
+Write paths for expenses and transactions.
+"""
+
+import json
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from model import User, Expense, Transaction
+from db_utils import dialect_insert, chunked, is_postgres, copy_rows
+from dates import parse_month
+from rollup import apply_transactions
+
+INSERT_BATCH_SIZE = 1000
+
+# Columns overwritten when an expense for an existing (user_id, month_start) is posted again
+EXPENSE_UPDATE_COLUMNS = [
+    "month", "rent", "loan_repayment", "insurance", "groceries", "transport", "eating_out",
+    "entertainment", "utilities", "healthcare", "education", "miscellaneous", "total_expense",
+]
+EXPENSE_COLUMNS = ["user_id", "month_start"] + EXPENSE_UPDATE_COLUMNS
+
+TRANSACTION_COLUMNS = ["user_id", "type", "description", "amount", "category", "date"]
+TRANSACTION_TYPES = ["income", "expense"]
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def expense_row(expense) -> dict:
+    """Build an insertable expense row with its normalized month_start."""
+    row = expense.model_dump()
+    row["month_start"] = parse_month(row["month"])
+    return row
+
+
+def existing_user_ids(db: Session, user_ids) -> set:
+    """Return which of the given user ids exist, using a single IN query."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return set()
+    return {row[0] for row in db.query(User.id).filter(User.id.in_(user_ids))}
+
+
+def validate_expenses(db: Session, expenses):
+    """Split expenses into insertable rows and per-row errors ({"index", "detail"})."""
+    known_users = existing_user_ids(db, (expense.user_id for expense in expenses))
+    rows, errors = [], []
+    for index, expense in enumerate(expenses):
+        if expense.user_id not in known_users:
+            errors.append({"index": index, "detail": f"User ID {expense.user_id} does not exist"})
+            continue
+        try:
+            rows.append(expense_row(expense))
+        except ValueError as e:
+            errors.append({"index": index, "detail": str(e)})
+    return rows, errors
+
+
+def _copy_upsert_expenses(db: Session, rows):
+    """COPY rows into a staging table, then upsert them into expenses in one statement."""
+    columns = ", ".join(EXPENSE_COLUMNS)
+    # Dropped at the end rather than ON COMMIT, so several upserts can share one transaction;
+    # a rollback discards it along with everything else.
+    db.execute(text(
+        f"CREATE TEMP TABLE expenses_staging AS "
+        f"SELECT {columns} FROM expenses WITH NO DATA"
+    ))
+    copy_rows(db, "expenses_staging", EXPENSE_COLUMNS, rows)
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in EXPENSE_UPDATE_COLUMNS)
+    db.execute(text(
+        f"INSERT INTO expenses ({columns}) SELECT {columns} FROM expenses_staging "
+        f"ON CONFLICT (user_id, month_start) DO UPDATE SET {updates}"
+    ))
+    db.execute(text("DROP TABLE expenses_staging"))
+
+
+def upsert_expenses(db: Session, rows):
+    """Insert expense rows, replacing any existing row for the same user and month.
+
+    PostgreSQL loads the batch with COPY; other databases get multi-row
+    INSERT .. ON CONFLICT statements.
+    """
+    # A single INSERT .. ON CONFLICT cannot touch the same key twice; the last row wins.
+    latest = {}
+    for row in rows:
+        latest[(row["user_id"], row["month_start"])] = row
+    if not latest:
+        return 0
+    if is_postgres(db):
+        _copy_upsert_expenses(db, list(latest.values()))
+        return len(latest)
+    insert = dialect_insert(db)
+    for batch in chunked(latest.values(), INSERT_BATCH_SIZE):
+        stmt = insert(Expense).values(batch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "month_start"],
+            set_={column: stmt.excluded[column] for column in EXPENSE_UPDATE_COLUMNS},
+        )
+        db.execute(stmt)
+    return len(latest)
+
+
+def parse_transaction_payload(body: bytes, content_type: str):
+    """Decode a bulk transaction body: a JSON array / {"transactions": [...]} or NDJSON lines."""
+    try:
+        if content_type.split(";")[0].strip().lower() in NDJSON_CONTENT_TYPES:
+            records = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            records = json.loads(body)
+            if isinstance(records, dict):
+                records = records.get("transactions")
+    except ValueError as e:
+        raise ValueError(f"Malformed payload: {e}")
+    if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+        raise ValueError("Expected a list of transaction objects")
+    return records
+
+
+def validate_transactions(db: Session, records):
+    """Validate raw transaction records column-wise.
+
+    Returns insertable rows and per-row errors ({"index", "detail"}); only
+    the first problem of each row is reported.
+    """
+    if not records:
+        return [], []
+    frame = pd.DataFrame.from_records(records, columns=TRANSACTION_COLUMNS)
+    problems = pd.Series("", index=frame.index, dtype=object)
+
+    def flag(mask, detail):
+        problems[mask & (problems == "")] = detail
+
+    user_ids = pd.to_numeric(frame["user_id"], errors="coerce")
+    flag(user_ids.isna() | (user_ids % 1 != 0), "user_id must be an integer")
+    flag(~frame["type"].isin(TRANSACTION_TYPES), "type must be 'income' or 'expense'")
+    for column in ("description", "category"):
+        flag(frame[column].map(type) != str, f"{column} must be a string")
+    amounts = pd.to_numeric(frame["amount"], errors="coerce")
+    flag(~np.isfinite(amounts), "amount must be a number")
+    dates = pd.to_datetime(frame["date"], format="%Y-%m-%d", errors="coerce")
+    flag(dates.isna(), "date must be in YYYY-MM-DD format")
+
+    candidate_ids = user_ids[problems == ""].astype("int64")
+    known_users = existing_user_ids(db, candidate_ids.unique().tolist())
+    flag(~user_ids.isin(list(known_users)), "User ID does not exist")
+
+    errors = [{"index": int(index), "detail": detail} for index, detail in problems[problems != ""].items()]
+    valid = problems == ""
+    rows = [
+        {
+            "user_id": int(user_id),
+            "type": tx_type,
+            "description": description,
+            "amount": float(amount),
+            "category": category,
+            "date": date,
+        }
+        for user_id, tx_type, description, amount, category, date in zip(
+            user_ids[valid],
+            frame["type"][valid],
+            frame["description"][valid],
+            amounts[valid],
+            frame["category"][valid],
+            dates[valid].dt.date,
+        )
+    ]
+    return rows, errors
+
+
+def insert_transactions(db: Session, rows):
+    """Insert validated transaction rows and fold them into the monthly rollups.
+
+    PostgreSQL loads the batch with COPY; other databases get multi-row
+    INSERT statements. Nothing is committed here.
+    """
+    if not rows:
+        return 0
+    if is_postgres(db):
+        copy_rows(db, "transactions", TRANSACTION_COLUMNS, rows)
+    else:
+        for batch in chunked(rows, INSERT_BATCH_SIZE):
+            db.execute(Transaction.__table__.insert(), batch)
+    apply_transactions(db, rows)
+    return len(rows)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Lifetime ledger summaries.
+
+`ledger_summaries` keeps one row per user with running lifetime income,
+expenses, balance and transaction count, so the dashboard reads lifetime
+figures by primary key. Rows are incremented in the same DB transaction
+as every transaction insert (via rollup.apply_transactions); `verify`
+and `repair` recompute them in bulk from raw transactions.
+
+Usage:
+    python ledger.py verify
+    python ledger.py repair
+"""
+
+import argparse
+from sqlalchemy import case, exists, func, or_, select
+from sqlalchemy.orm import Session
+
+from model import SessionLocal, Transaction, LedgerSummary
+from db_utils import dialect_insert, chunked
+from cache import mark_dashboard_stale
+
+# Running float sums may drift slightly from a fresh SUM; differences below this are ignored
+LEDGER_TOLERANCE = 0.01
+UPSERT_BATCH_SIZE = 1000
+
+
+def _delta(tx_type: str, amount: float):
+    income = amount if tx_type == "income" else 0.0
+    expenses = amount if tx_type == "expense" else 0.0
+    return income, expenses
+
+
+def apply_to_ledger(db: Session, items):
+    """Add (user_id, type, amount) items onto the users' ledger rows, creating missing rows."""
+    totals = {}
+    for user_id, tx_type, amount in items:
+        income, expenses = _delta(tx_type, float(amount))
+        entry = totals.setdefault(user_id, [0.0, 0.0, 0])
+        entry[0] += income
+        entry[1] += expenses
+        entry[2] += 1
+    rows = [
+        {
+            "user_id": user_id,
+            "total_income": income,
+            "total_expenses": expenses,
+            "balance": income - expenses,
+            "tx_count": count,
+        }
+        for user_id, (income, expenses, count) in totals.items()
+    ]
+    insert = dialect_insert(db)
+    for batch in chunked(rows, UPSERT_BATCH_SIZE):
+        stmt = insert(LedgerSummary).values(batch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={
+                "total_income": LedgerSummary.total_income + stmt.excluded.total_income,
+                "total_expenses": LedgerSummary.total_expenses + stmt.excluded.total_expenses,
+                "balance": LedgerSummary.balance + stmt.excluded.balance,
+                "tx_count": LedgerSummary.tx_count + stmt.excluded.tx_count,
+                "updated_at": func.now(),
+            },
+        )
+        db.execute(stmt)
+
+
+def _aggregate():
+    """SELECT user_id, lifetime income, expenses and count from raw transactions."""
+    return select(
+        Transaction.user_id.label("user_id"),
+        func.coalesce(func.sum(case((Transaction.type == "income", Transaction.amount), else_=0.0)), 0.0).label("total_income"),
+        func.coalesce(func.sum(case((Transaction.type == "expense", Transaction.amount), else_=0.0)), 0.0).label("total_expenses"),
+        func.count(Transaction.id).label("tx_count"),
+    ).group_by(Transaction.user_id)
+
+
+def _differs(a, b):
+    return func.abs(a - b) > LEDGER_TOLERANCE
+
+
+def verify(db: Session):
+    """Return the user ids whose ledger row disagrees with their transactions, in one bulk pass."""
+    actual = _aggregate().subquery()
+    drifted = select(actual.c.user_id).outerjoin(
+        LedgerSummary, LedgerSummary.user_id == actual.c.user_id
+    ).where(or_(
+        LedgerSummary.user_id.is_(None),
+        _differs(actual.c.total_income, LedgerSummary.total_income),
+        _differs(actual.c.total_expenses, LedgerSummary.total_expenses),
+        _differs(actual.c.total_income - actual.c.total_expenses, LedgerSummary.balance),
+        actual.c.tx_count != LedgerSummary.tx_count,
+    ))
+    # Ledger rows left behind for users whose transactions no longer exist
+    orphaned = select(LedgerSummary.user_id).where(
+        LedgerSummary.tx_count != 0,
+        ~exists().where(Transaction.user_id == LedgerSummary.user_id),
+    )
+    user_ids = {row[0] for row in db.execute(drifted)}
+    user_ids |= {row[0] for row in db.execute(orphaned)}
+    return sorted(user_ids)
+
+
+def repair(db: Session, user_ids=None) -> int:
+    """Rewrite ledger rows from raw transactions; defaults to the users `verify` reports.
+
+    Each ledger row is locked before it is recomputed so concurrent
+    increments are serialized behind the repair instead of being lost.
+    """
+    if user_ids is None:
+        user_ids = verify(db)
+    insert = dialect_insert(db)
+    for user_id in user_ids:
+        db.query(LedgerSummary).filter(LedgerSummary.user_id == user_id).with_for_update().first()
+        row = db.execute(_aggregate().where(Transaction.user_id == user_id)).first()
+        income, expenses, count = (row.total_income, row.total_expenses, row.tx_count) if row else (0.0, 0.0, 0)
+        stmt = insert(LedgerSummary).values(
+            user_id=user_id,
+            total_income=income,
+            total_expenses=expenses,
+            balance=income - expenses,
+            tx_count=count,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id"],
+            set_={
+                "total_income": stmt.excluded.total_income,
+                "total_expenses": stmt.excluded.total_expenses,
+                "balance": stmt.excluded.balance,
+                "tx_count": stmt.excluded.tx_count,
+                "updated_at": func.now(),
+            },
+        )
+        db.execute(stmt)
+        mark_dashboard_stale(db, user_id)
+    return len(user_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify or repair lifetime ledger summaries.")
+    parser.add_argument("command", choices=["verify", "repair"])
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "verify":
+            drifted = verify(db)
+            print(f"{len(drifted)} ledger rows out of sync" + (f": {drifted}" if drifted else "."))
+        else:
+            repaired = repair(db)
+            db.commit()
+            print(f"Repaired {repaired} ledger rows.")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
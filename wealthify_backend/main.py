@@ -1,26 +1,28 @@
-from fastapi import FastAPI, Depends, HTTPException, Form, Body, Path
+from fastapi import FastAPI, Depends, HTTPException, Form, Body, Path, Request, Response, UploadFile, File, Query
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 from typing import Optional, List
 import os
+import json
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi_mail import FastMail, MessageSchema, ConnectionConfig, MessageType
 from itsdangerous import URLSafeSerializer,URLSafeTimedSerializer
 import os 
 from pydantic import SecretStr
-from sqlalchemy import func
+from sqlalchemy import tuple_
 import requests
-import yfinance as yf
 
 
 
 app = FastAPI()
 
-from model import get_db, User, Expense, Transaction, Feedback, Asset, PortfolioSnapshot
+from model import get_db, SessionLocal, User, Expense, Transaction, Feedback, Asset
 from schema import (
     UserCreate,
     Token,
@@ -30,23 +32,50 @@ from schema import (
     ExpensePredictInput,
     SavingsPredictionInput,
     PredictionResponse,
+    ExpensePredictBatchInput,
+    SavingsPredictBatchInput,
+    BatchPredictionResult,
+    ModelPromoteInput,
     TransactionCreate,
     TransactionResponse,
     DashboardData,
-    FinancialSummary,
-    SpendingCategory,
     AssetCreate,
     AssetResponse,
-    PortfolioSnapshotResponse,
+    AssetValuationResponse,
+    PortfolioHistoryPoint,
     PortfolioOverviewResponse
 )
-from ml_model import predict_expense, predict_savings
+from ml_model import predict_expense, predict_savings, predict_expense_batch, predict_savings_batch, model_registry
+from model_registry import ModelVersionNotFound
+from inference import inference_executor, InferenceOverloaded, InferenceTimeout, INFERENCE_TIMEOUT, INFERENCE_BATCH_TIMEOUT
+from dashboard import build_dashboard
+from dates import month_bounds, parse_month
+from rollup import apply_transactions
+from ingest import (
+    validate_expenses,
+    upsert_expenses,
+    parse_transaction_payload,
+    validate_transactions,
+    insert_transactions
+)
+from importer import import_csv, DEFAULT_CHUNK_SIZE
+from pagination import NEXT_CURSOR_HEADER, encode_cursor, decode_cursor
+from export import stream_expenses, EXPORT_MEDIA_TYPES
+from cache import dashboard_cache, mark_dashboard_stale
+from market_data import load_prices
+from history import load_history
+from snapshots import upsert_snapshot
+from valuation import value_assets
 
 # Load environment variables
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+MAX_BULK_TRANSACTIONS = int(os.getenv("MAX_BULK_TRANSACTIONS", 50000))
+MAX_TRANSACTIONS_PAGE_SIZE = 100
+MAX_HISTORY_POINTS = 1000
+MAX_PREDICTION_BATCH = int(os.getenv("MAX_PREDICTION_BATCH", 10000))
 
 # App and security setup
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -63,6 +92,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "X-Model-Version"],
 )
 
 # email and token config
@@ -215,63 +245,195 @@ async def create_expenses(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    for expense in bulk_expenses.expenses:
-        db_user = db.query(User).filter(User.id == expense.user_id).first()
-        if not db_user:
-            raise HTTPException(status_code=400, detail=f"User ID {expense.user_id} does not exist")
-        db_expense = Expense(**expense.dict())
-        db.add(db_expense)
+    rows, errors = validate_expenses(db, bulk_expenses.expenses)
+    written = upsert_expenses(db, rows)
     db.commit()
-    return {"message": "Expenses added successfully"}
+    return {
+        "message": "Expenses added successfully" if not errors else "Some expenses were rejected",
+        "written": written,
+        "errors": errors
+    }
 
-# ✅ Fetch specific user's expenses
+# ✅ Fetch specific user's expenses (format=ndjson|csv streams the rows)
 @app.get("/expenses/{user_id}", response_model=List[ExpenseResponse])
 async def get_expenses(
     user_id: int,
     month: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson|csv)$"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     query = db.query(Expense).filter(Expense.user_id == user_id)
+    month_start = None
     if month:
-        query = query.filter(Expense.month == month)
+        try:
+            month_start = parse_month(month)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.filter(Expense.month_start == month_start)
+    if format != "json":
+        if not db.query(query.exists()).scalar():
+            raise HTTPException(status_code=404, detail="No expenses found")
+        return StreamingResponse(stream_expenses(format, user_id, month_start), media_type=EXPORT_MEDIA_TYPES[format])
     expenses = query.all()
     if not expenses:
         raise HTTPException(status_code=404, detail="No expenses found")
     return expenses
 
-# ✅ Fetch all expenses
+# ✅ Fetch all expenses (format=ndjson|csv streams the rows)
 @app.get("/expenses", response_model=List[ExpenseResponse])
 async def get_all_expenses(
     month: Optional[str] = None,
+    format: str = Query("json", pattern="^(json|ndjson|csv)$"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     query = db.query(Expense)
+    month_start = None
     if month:
-        query = query.filter(Expense.month == month)
+        try:
+            month_start = parse_month(month)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        query = query.filter(Expense.month_start == month_start)
+    if format != "json":
+        return StreamingResponse(stream_expenses(format, month_start=month_start), media_type=EXPORT_MEDIA_TYPES[format])
     return query.all()
 
+MODEL_VERSION_HEADER = "X-Model-Version"
+
+def serving_version(name: str, model_version: Optional[str], current_user: User) -> str:
+    """Version a prediction runs on; only admins may pin one other than the active version."""
+    active = model_registry.active_version(name)
+    if model_version is None or model_version == active:
+        return active
+    # Every uncached pin loads and compiles a model on the inference pool, so keep it to admins
+    if not getattr(current_user, 'is_admin', False):
+        raise HTTPException(status_code=403, detail="Only admins can pin a model version")
+    if model_version not in model_registry.versions(name):
+        raise HTTPException(status_code=404, detail=f"Model '{name}' has no version '{model_version}'")
+    return model_version
+
+async def run_prediction(fn, *args, timeout: float = INFERENCE_TIMEOUT, **kwargs):
+    """Run fn(*args, db, **kwargs) on the bounded inference pool with its own DB session."""
+    def job():
+        db = SessionLocal()
+        try:
+            return fn(*args, db, **kwargs)
+        finally:
+            db.close()
+    try:
+        return await inference_executor.run(job, timeout=timeout)
+    except ModelVersionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InferenceOverloaded:
+        raise HTTPException(status_code=503, detail="Prediction service is busy, please retry shortly", headers={"Retry-After": "1"})
+    except InferenceTimeout:
+        raise HTTPException(status_code=504, detail="Prediction timed out")
+
 # ✅ Expense prediction endpoint
 @app.post("/predict-expense", response_model=PredictionResponse)
 async def predict_expense_endpoint(
     input: ExpensePredictInput,
-    db: Session = Depends(get_db),
+    response: Response,
+    model_version: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    prediction = predict_expense(input.user_id, input.month, db)
+    # Pin the version up front so a concurrent swap cannot change it mid-request
+    version = serving_version("expense", model_version, current_user)
+    response.headers[MODEL_VERSION_HEADER] = version
+    prediction = await run_prediction(predict_expense, input.user_id, input.month, version=version)
     return PredictionResponse(prediction=prediction, month=input.month)
 
 # ✅ Savings prediction endpoint
 @app.post("/predict/savings", response_model=PredictionResponse)
 async def predict_savings_endpoint(
     input: SavingsPredictionInput,
-    db: Session = Depends(get_db),
+    response: Response,
+    model_version: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    prediction = predict_savings(input.user_id, input.month, input.income, db)
+    version = serving_version("savings", model_version, current_user)
+    response.headers[MODEL_VERSION_HEADER] = version
+    prediction = await run_prediction(predict_savings, input.user_id, input.month, input.income, version=version)
     return PredictionResponse(prediction=prediction, month=input.month)
 
+# ✅ Batch expense predictions: one feature query and one model call for all items
+@app.post("/predict-expense/batch", response_model=List[BatchPredictionResult])
+async def predict_expense_batch_endpoint(
+    input: ExpensePredictBatchInput,
+    response: Response,
+    model_version: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    if len(input.items) > MAX_PREDICTION_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_PREDICTION_BATCH} items per batch")
+    version = serving_version("expense", model_version, current_user)
+    response.headers[MODEL_VERSION_HEADER] = version
+    results = await run_prediction(
+        predict_expense_batch, [(item.user_id, item.month) for item in input.items],
+        timeout=INFERENCE_BATCH_TIMEOUT, version=version
+    )
+    return [
+        BatchPredictionResult(user_id=item.user_id, month=item.month, **result)
+        for item, result in zip(input.items, results)
+    ]
+
+# ✅ Batch savings predictions
+@app.post("/predict/savings/batch", response_model=List[BatchPredictionResult])
+async def predict_savings_batch_endpoint(
+    input: SavingsPredictBatchInput,
+    response: Response,
+    model_version: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    if len(input.items) > MAX_PREDICTION_BATCH:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_PREDICTION_BATCH} items per batch")
+    version = serving_version("savings", model_version, current_user)
+    response.headers[MODEL_VERSION_HEADER] = version
+    results = await run_prediction(
+        predict_savings_batch, [(item.user_id, item.month, item.income) for item in input.items],
+        timeout=INFERENCE_BATCH_TIMEOUT, version=version
+    )
+    return [
+        BatchPredictionResult(user_id=item.user_id, month=item.month, **result)
+        for item, result in zip(input.items, results)
+    ]
+
+# ✅ Model registry administration (admins only)
+def require_admin(current_user: User = Depends(get_current_user)):
+    if not getattr(current_user, 'is_admin', False):
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return current_user
+
+@app.get("/admin/models")
+def list_models(current_user: User = Depends(require_admin)):
+    return model_registry.describe()
+
+@app.post("/admin/models/{name}/promote")
+def promote_model(
+    name: str = Path(..., pattern="^(expense|savings)$"),
+    input: ModelPromoteInput = Body(...),
+    current_user: User = Depends(require_admin)
+):
+    # Loads and warms the version while the current one keeps serving, then swaps
+    try:
+        loaded = model_registry.promote(name, input.version)
+    except ModelVersionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"message": f"Model '{name}' now serving version {loaded.version}", "version": loaded.version}
+
+@app.post("/admin/models/{name}/rollback")
+def rollback_model(
+    name: str = Path(..., pattern="^(expense|savings)$"),
+    current_user: User = Depends(require_admin)
+):
+    try:
+        loaded = model_registry.rollback(name)
+    except ModelVersionNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"message": f"Model '{name}' rolled back to version {loaded.version}", "version": loaded.version}
+
 # ✅ Add transaction
 @app.post("/transactions", response_model=TransactionResponse)
 async def create_transaction(
@@ -286,127 +448,124 @@ async def create_transaction(
     
     db_transaction = Transaction(**transaction.dict())
     db.add(db_transaction)
+    apply_transactions(db, [db_transaction])
     db.commit()
     db.refresh(db_transaction)
     return db_transaction
 
-# ✅ Get user transactions
+# ✅ Bulk add transactions (JSON array or NDJSON body)
+@app.post("/transactions/bulk")
+async def create_transactions_bulk(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    try:
+        records = parse_transaction_payload(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(records) > MAX_BULK_TRANSACTIONS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_TRANSACTIONS} transactions per request")
+    rows, errors = validate_transactions(db, records)
+    written = insert_transactions(db, rows)
+    db.commit()
+    return {
+        "message": "Transactions added successfully" if not errors else "Some transactions were rejected",
+        "written": written,
+        "errors": errors
+    }
+
+# ✅ Import expenses or transactions from an uploaded CSV file
+@app.post("/import/{kind}")
+def import_csv_file(
+    kind: str = Path(..., pattern="^(expenses|transactions)$"),
+    file: UploadFile = File(...),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=100, le=50000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    # Uploads are spooled to disk by Starlette; the importer reads them chunk by chunk.
+    summary = import_csv(db, file.file, kind, default_user_id=current_user.id, chunk_size=chunk_size)
+    if summary["error"]:
+        # Chunks before the failure stay committed; the summary says how much was written
+        raise HTTPException(status_code=400, detail=summary)
+    return summary
+
+# ✅ Get user transactions (keyset-paginated, newest first)
 @app.get("/transactions/{user_id}", response_model=List[TransactionResponse])
 async def get_transactions(
     user_id: int,
-    limit: Optional[int] = 10,
+    response: Response,
+    limit: int = Query(10, ge=1, le=MAX_TRANSACTIONS_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    month: Optional[str] = None,
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    min_amount: Optional[float] = None,
+    max_amount: Optional[float] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    query = db.query(Transaction).filter(Transaction.user_id == user_id).order_by(Transaction.created_at.desc())
-    if limit:
-        query = query.limit(limit)
-    transactions = query.all()
+    query = db.query(Transaction).filter(Transaction.user_id == user_id)
+    if type:
+        query = query.filter(Transaction.type == type)
+    if category:
+        query = query.filter(Transaction.category == category)
+    if month:
+        try:
+            start, end = month_bounds(month)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="month must be in YYYY-MM format")
+        query = query.filter(Transaction.date >= start, Transaction.date < end)
+    if date_from:
+        query = query.filter(Transaction.date >= date_from)
+    if date_to:
+        query = query.filter(Transaction.date <= date_to)
+    if min_amount is not None:
+        query = query.filter(Transaction.amount >= min_amount)
+    if max_amount is not None:
+        query = query.filter(Transaction.amount <= max_amount)
+    if cursor:
+        try:
+            after_created_at, after_id = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Row-value comparison lets the (user_id, created_at DESC, id DESC) index seek straight to the page
+        query = query.filter(tuple_(Transaction.created_at, Transaction.id) < tuple_(after_created_at, after_id))
+
+    # Fetch one extra row to know whether another page exists
+    transactions = query.order_by(Transaction.created_at.desc(), Transaction.id.desc()).limit(limit + 1).all()
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        last = transactions[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
     return transactions
 
-# ✅ Get dashboard data
+# ✅ Get dashboard data (cached per user, revalidated with ETag / If-None-Match)
 @app.get("/dashboard/{user_id}", response_model=DashboardData)
 async def get_dashboard_data(
     user_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    # Get recent transactions
-    recent_transactions = db.query(Transaction).filter(
-        Transaction.user_id == user_id
-    ).order_by(Transaction.created_at.desc()).limit(5).all()
-    
-    # Calculate financial summary
-    current_month = datetime.now().strftime("%Y-%m")
-    # Calculate last month string
-    last_month_date = datetime.now().replace(day=1) - timedelta(days=1)
-    last_month = last_month_date.strftime("%Y-%m")
-    
-    # Get monthly income (transactions with type "income" in current month)
-    monthly_income = db.query(Transaction).filter(
-        Transaction.user_id == user_id,
-        Transaction.type == "income",
-        Transaction.date.like(f"{current_month}%")
-    ).with_entities(func.sum(Transaction.amount)).scalar() or 0.0
-    
-    # Get monthly expenses (transactions with type "expense" in current month)
-    monthly_expenses = db.query(Transaction).filter(
-        Transaction.user_id == user_id,
-        Transaction.type == "expense",
-        Transaction.date.like(f"{current_month}%")
-    ).with_entities(func.sum(Transaction.amount)).scalar() or 0.0
-    
-    # Calculate total balance (all income - all expenses)
-    total_income = db.query(Transaction).filter(
-        Transaction.user_id == user_id,
-        Transaction.type == "income"
-    ).with_entities(func.sum(Transaction.amount)).scalar() or 0.0
-    
-    total_expenses = db.query(Transaction).filter(
-        Transaction.user_id == user_id,
-        Transaction.type == "expense"
-    ).with_entities(func.sum(Transaction.amount)).scalar() or 0.0
-    
-    total_balance = total_income - total_expenses
-
-    # Calculate last month's income and expenses
-    last_month_income = db.query(Transaction).filter(
-        Transaction.user_id == user_id,
-        Transaction.type == "income",
-        Transaction.date.like(f"{last_month}%")
-    ).with_entities(func.sum(Transaction.amount)).scalar() or 0.0
-    last_month_expenses = db.query(Transaction).filter(
-        Transaction.user_id == user_id,
-        Transaction.type == "expense",
-        Transaction.date.like(f"{last_month}%")
-    ).with_entities(func.sum(Transaction.amount)).scalar() or 0.0
-    last_month_balance = last_month_income - last_month_expenses
-
-    # Fetch user from database
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    # Use user's savings_goal from DB
-    savings_goal = user.savings_goal if user.savings_goal is not None else 10000.0
-    current_savings = max(0, total_balance * 0.2)  # 20% of balance as savings
-    
-    # Calculate spending categories
-    category_expenses = db.query(
-        Transaction.category,
-        func.sum(Transaction.amount).label('total_amount')
-    ).filter(
-        Transaction.user_id == user_id,
-        Transaction.type == "expense",
-        Transaction.date.like(f"{current_month}%")
-    ).group_by(Transaction.category).all()
-    
-    total_category_expenses = sum(cat.total_amount for cat in category_expenses)
-    
-    spending_categories = []
-    for cat in category_expenses:
-        percentage = (cat.total_amount / total_category_expenses * 100) if total_category_expenses > 0 else 0
-        spending_categories.append(SpendingCategory(
-            category=cat.category,
-            amount=cat.total_amount,
-            percentage=round(percentage, 1)
-        ))
-    
-    summary = FinancialSummary(
-        total_balance=total_balance,
-        monthly_income=monthly_income,
-        monthly_expenses=monthly_expenses,
-        savings_goal=savings_goal,
-        current_savings=current_savings,
-        last_month_balance=last_month_balance,
-        last_month_income=last_month_income,
-        last_month_expenses=last_month_expenses
-    )
-    
-    return DashboardData(
-        summary=summary,
-        recent_transactions=[TransactionResponse(**transaction.__dict__) for transaction in recent_transactions],
-        spending_categories=spending_categories
-    )
+    # Read before building, so a write committed meanwhile keeps this body out of the cache
+    generation = dashboard_cache.generation(user_id)
+    cached = dashboard_cache.get(user_id, generation)
+    if cached is None:
+        dashboard = build_dashboard(user_id, db)
+        # Same encoding FastAPI applies to response_model output, so cached bodies are identical
+        body = json.dumps(jsonable_encoder(dashboard), ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+        etag = dashboard_cache.put(user_id, body, generation)
+    else:
+        etag, body = cached
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.put("/users/{user_id}/savings-goal")
 async def update_savings_goal(
@@ -422,6 +581,7 @@ async def update_savings_goal(
         print("User not found!")
         raise HTTPException(status_code=404, detail="User not found")
     user.savings_goal = new_goal  # type: ignore
+    mark_dashboard_stale(db, user_id)
     db.commit()
     db.refresh(user)
     print("Updated savings_goal:", user.savings_goal)
@@ -471,26 +631,6 @@ def list_assets(
 ):
     return db.query(Asset).filter(Asset.user_id == current_user.id).all()
 
-def fetch_yahoo_price(symbol: str, asset_type: str) -> float:
-    if asset_type == "crypto":
-        symbol = f"{symbol}-INR"
-    elif asset_type == "stock":
-        # Assume Indian stocks unless symbol is all uppercase (US stock)
-        if symbol.isupper():
-            pass  # US stock, use as is
-        else:
-            symbol = f"{symbol}.NS"
-    else:
-        return 0.0  # For mutual funds/cash, no live price
-    try:
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period='1d')
-        if not hist.empty:
-            return float(hist['Close'].iloc[-1])
-    except Exception:
-        pass
-    return 0.0
-
 # Portfolio overview (total value, gain/loss)
 @app.get("/portfolio/overview", response_model=PortfolioOverviewResponse)
 def portfolio_overview(
@@ -498,70 +638,58 @@ def portfolio_overview(
     current_user: User = Depends(get_current_user)
 ):
     assets = db.query(Asset).filter(Asset.user_id == current_user.id).all()
-    total_value = 0.0
-    invested_total = 0.0
+    # Shared prices table first, one batched live fetch for anything it lacks
+    prices = load_prices(db, ((str(asset.symbol), asset.type) for asset in assets))
+    # ✅ Every holding valued in one vectorized pass (falls back to buy price without a live quote)
+    valuation = value_assets(assets, prices)
     asset_responses = []
-    for asset in assets:
-        buy_price = float(getattr(asset, 'buy_price', 0.0))
-        quantity = float(getattr(asset, 'quantity', 0.0))
-        asset_id = getattr(asset, 'id', 0) or 0
+    for i, asset in enumerate(assets):
         buy_date = getattr(asset, 'buy_date', None)
-        asset_type = getattr(asset, 'type', 'crypto')
         if not isinstance(buy_date, datetime):
             buy_date = datetime.utcnow()
-        # Fetch live price or fallback
-        if asset_type in ["crypto", "stock"]:
-            current_price = fetch_yahoo_price(str(getattr(asset, 'symbol', '')), asset_type)
-            if current_price == 0.0:
-                current_price = buy_price
-        else:
-            current_price = buy_price
-        value = current_price * quantity
-        total_value += value
-        invested_total += buy_price * quantity
-        asset_responses.append(AssetResponse(
-            id=asset_id,
+        asset_responses.append(AssetValuationResponse(
+            id=getattr(asset, 'id', 0) or 0,
             name=getattr(asset, 'name', ''),
             symbol=getattr(asset, 'symbol', ''),
-            quantity=quantity,
-            buy_price=buy_price,
+            quantity=float(valuation.quantity[i]),
+            buy_price=float(valuation.buy_price[i]),
             buy_date=buy_date,
-            type=asset_type
+            type=getattr(asset, 'type', 'crypto'),
+            current_price=float(valuation.current_price[i]),
+            value=float(valuation.value[i]),
+            gain_loss=float(valuation.gain_loss[i])
         ))
-    gain_loss = total_value - invested_total
-    percent_change = (gain_loss / invested_total * 100) if invested_total and invested_total > 0 else 0
     return PortfolioOverviewResponse(
-        total_value=float(total_value),
-        invested_total=float(invested_total),
-        gain_loss=float(gain_loss),
-        percent_change=float(percent_change),
+        total_value=valuation.total_value,
+        invested_total=valuation.invested_total,
+        gain_loss=valuation.total_gain_loss,
+        percent_change=valuation.percent_change,
         assets=asset_responses
     )
 
-# Save daily snapshot (call from CRON or login)
+# Save the snapshot for the current period (call from CRON or login)
 @app.post("/portfolio/snapshot")
 def save_snapshot(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     assets = db.query(Asset).filter(Asset.user_id == current_user.id).all()
-    total_value = sum(
-        fetch_yahoo_price(str(getattr(asset, 'symbol', '')), getattr(asset, 'type', 'crypto')) * float(getattr(asset, 'quantity', 0.0))
-        if getattr(asset, 'type', 'crypto') in ["crypto", "stock"] else float(getattr(asset, 'buy_price', 0.0)) * float(getattr(asset, 'quantity', 0.0))
-        for asset in assets
-    )
-    snapshot = PortfolioSnapshot(user_id=current_user.id, value=total_value)
-    db.add(snapshot)
+    prices = load_prices(db, ((str(asset.symbol), asset.type) for asset in assets))
+    total_value = value_assets(assets, prices).total_value
+    # ✅ One snapshot per user and period; repeated calls update it
+    upsert_snapshot(db, current_user.id, total_value)
     db.commit()
     return {"message": "Snapshot saved", "value": total_value}
 
-# Get performance history
-@app.get("/portfolio/history", response_model=List[PortfolioSnapshotResponse])
+# Get performance history, optionally bucketed into OHLC candles and thinned with LTTB
+@app.get("/portfolio/history", response_model=List[PortfolioHistoryPoint])
 def get_history(
+    resolution: str = Query("raw", pattern="^(raw|daily|weekly|monthly)$"),
+    max_points: int = Query(MAX_HISTORY_POINTS, ge=3, le=MAX_HISTORY_POINTS),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(PortfolioSnapshot).filter(PortfolioSnapshot.user_id == current_user.id).order_by(PortfolioSnapshot.timestamp).all()
+    return load_history(db, current_user.id, resolution, max_points)
 
 @app.put("/assets/{asset_id}", response_model=AssetResponse)
 def update_asset(
@@ -599,3 +727,5 @@ if __name__ == "__main__":
 else:
     from scheduler import start_scheduler
     start_scheduler()
+    # Pick up model versions promoted through other workers
+    model_registry.start_watching()
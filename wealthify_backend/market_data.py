@@ -0,0 +1,82 @@
+"""
+Shared market data.
+
+A background job collects the distinct (symbol, type) pairs held in
+`assets`, fetches them in batches and upserts the results into the
+`prices` table. Portfolio reads then look prices up in that table, so
+quote traffic scales with distinct symbols instead of users x requests.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from model import Asset, Price
+from db_utils import dialect_insert, chunked
+from pricing import resolve_ticker, price_provider, fetch_prices
+
+MARKET_DATA_REFRESH_SECONDS = int(os.getenv("MARKET_DATA_REFRESH_SECONDS", 300))
+# Table prices older than this are treated as missing and fetched live instead
+PRICE_MAX_AGE = int(os.getenv("PRICE_MAX_AGE", 3600))
+REFRESH_BATCH_SIZE = 200
+LIVE_PRICED_TYPES = ["crypto", "stock"]
+
+
+def held_pairs(db: Session):
+    """Distinct (symbol, type) pairs with a live price across all holdings."""
+    return db.query(Asset.symbol, Asset.type).filter(
+        Asset.type.in_(LIVE_PRICED_TYPES), Asset.symbol.isnot(None)
+    ).distinct().all()
+
+
+def refresh_prices(db: Session) -> int:
+    """Fetch every held symbol and upsert the prices table; returns the number of prices written."""
+    written = 0
+    insert = dialect_insert(db)
+    for batch in chunked(held_pairs(db), REFRESH_BATCH_SIZE):
+        tickers = {resolve_ticker(symbol, asset_type)[0]: (symbol, asset_type) for symbol, asset_type in batch}
+        quotes = price_provider.fetch_many(tickers)
+        now = datetime.now(timezone.utc)
+        rows = [
+            {"symbol": symbol, "type": asset_type, "price": quotes[ticker], "fetched_at": now}
+            for ticker, (symbol, asset_type) in tickers.items()
+            if quotes.get(ticker) is not None
+        ]
+        if not rows:
+            continue
+        stmt = insert(Price).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["symbol", "type"],
+            set_={"price": stmt.excluded.price, "fetched_at": stmt.excluded.fetched_at},
+        )
+        db.execute(stmt)
+        written += len(rows)
+    return written
+
+
+def load_prices(db: Session, pairs) -> dict:
+    """Current prices for (symbol, type) pairs: {(symbol, type): price}.
+
+    Reads the shared prices table; pairs it does not have yet, or has only
+    stale values for, fall back to the cached live quote path. Assets
+    without a live price map to 0.0.
+    """
+    pairs = {(str(symbol), asset_type) for symbol, asset_type in pairs if asset_type in LIVE_PRICED_TYPES}
+    if not pairs:
+        return {}
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=PRICE_MAX_AGE)
+    prices = {}
+    for batch in chunked(sorted(pairs), REFRESH_BATCH_SIZE):
+        rows = db.query(Price.symbol, Price.type, Price.price, Price.fetched_at).filter(
+            tuple_(Price.symbol, Price.type).in_(batch)
+        ).all()
+        for symbol, asset_type, price, fetched_at in rows:
+            if fetched_at.tzinfo is None:
+                fetched_at = fetched_at.replace(tzinfo=timezone.utc)
+            if fetched_at >= cutoff:
+                prices[(symbol, asset_type)] = price
+    missing = pairs - prices.keys()
+    if missing:
+        prices.update(fetch_prices(missing))
+    return prices
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+One-off schema migrations for databases created before a model change.
+
+`Base.metadata.create_all` only creates missing tables, so existing
+tables have to be altered in place. Every migration is idempotent.
+
+Usage:
+    python migrate.py transaction-dates
+    python migrate.py expense-months
+    python migrate.py transaction-keyset-indexes
+    python migrate.py snapshot-history-index
+    python migrate.py snapshot-periods
+"""
+
+import argparse
+from sqlalchemy import inspect, text
+
+from model import engine, PortfolioSnapshot
+from dates import parse_month
+from snapshots import SNAPSHOT_GRANULARITY, truncate_timestamp
+
+
+def _column_type(table: str, column: str) -> str:
+    for col in inspect(engine).get_columns(table):
+        if col["name"] == column:
+            return str(col["type"]).upper()
+    raise ValueError(f"Column {table}.{column} not found")
+
+
+def migrate_transaction_dates():
+    """Convert transactions.date / created_at from strings to DATE / TIMESTAMPTZ and add indexes."""
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            if _column_type("transactions", "date") != "DATE":
+                conn.execute(text(
+                    "ALTER TABLE transactions ALTER COLUMN date TYPE DATE "
+                    "USING substring(date from 1 for 10)::date"
+                ))
+            if "TIMESTAMP" not in _column_type("transactions", "created_at"):
+                conn.execute(text(
+                    "ALTER TABLE transactions ALTER COLUMN created_at TYPE TIMESTAMPTZ "
+                    "USING COALESCE(created_at::timestamptz, now())"
+                ))
+            conn.execute(text("ALTER TABLE transactions ALTER COLUMN created_at SET DEFAULT now()"))
+        else:
+            # SQLite keeps ISO strings; normalise them to the formats SQLAlchemy's Date/DateTime parse.
+            conn.execute(text("UPDATE transactions SET date = substr(date, 1, 10)"))
+            conn.execute(text(
+                "UPDATE transactions SET created_at = replace(created_at, 'T', ' ') "
+                "WHERE created_at LIKE '%T%'"
+            ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_transactions_user_type_date "
+            "ON transactions (user_id, type, date)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_transactions_user_created_at "
+            "ON transactions (user_id, created_at DESC)"
+        ))
+
+
+def migrate_expense_months():
+    """Populate expenses.month_start, drop duplicate months and add the unique (user_id, month_start) index."""
+    with engine.begin() as conn:
+        if "month_start" not in {col["name"] for col in inspect(engine).get_columns("expenses")}:
+            conn.execute(text("ALTER TABLE expenses ADD COLUMN month_start DATE"))
+
+        months = [row[0] for row in conn.execute(text(
+            "SELECT DISTINCT month FROM expenses WHERE month_start IS NULL"
+        ))]
+        unparseable = []
+        for month in months:
+            try:
+                month_start = parse_month(month)
+            except ValueError:
+                unparseable.append(month)
+                continue
+            conn.execute(
+                text("UPDATE expenses SET month_start = :month_start WHERE month = :month AND month_start IS NULL"),
+                {"month_start": month_start, "month": month},
+            )
+        if unparseable:
+            raise ValueError(f"Fix or remove expenses with unrecognized months before migrating: {unparseable}")
+
+        # Keep the most recently inserted row for each (user_id, month_start)
+        conn.execute(text("""
+            DELETE FROM expenses
+            WHERE id NOT IN (
+                SELECT MAX(id) FROM expenses GROUP BY user_id, month_start
+            )
+        """))
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("ALTER TABLE expenses ALTER COLUMN month_start SET NOT NULL"))
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_expenses_user_month_start "
+            "ON expenses (user_id, month_start)"
+        ))
+
+
+def migrate_transaction_keyset_indexes():
+    """Extend the recent-first index with id for keyset pagination and add the category index."""
+    with engine.begin() as conn:
+        if engine.dialect.name != "postgresql":
+            # SQLite's CURRENT_TIMESTAMP has no fractional seconds, so those rows would compare as
+            # strings out of step with the microsecond cursors SQLAlchemy binds.
+            conn.execute(text(
+                "UPDATE transactions SET created_at = created_at || '.000000' "
+                "WHERE length(created_at) = 19"
+            ))
+        conn.execute(text("DROP INDEX IF EXISTS ix_transactions_user_created_at"))
+        conn.execute(text(
+            "CREATE INDEX ix_transactions_user_created_at "
+            "ON transactions (user_id, created_at DESC, id DESC)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_transactions_user_category_date "
+            "ON transactions (user_id, category, date)"
+        ))
+
+
+def migrate_snapshot_history_index():
+    """Add the (user_id, timestamp) index used by portfolio history reads and retention."""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_portfolio_snapshots_user_timestamp "
+            "ON portfolio_snapshots (user_id, timestamp)"
+        ))
+
+
+def migrate_snapshot_periods():
+    """Populate portfolio_snapshots.period_start, keep the latest snapshot per period and add the unique index."""
+    with engine.begin() as conn:
+        if "period_start" not in {col["name"] for col in inspect(engine).get_columns("portfolio_snapshots")}:
+            conn.execute(text("ALTER TABLE portfolio_snapshots ADD COLUMN period_start TIMESTAMP"))
+        period = truncate_timestamp(engine.dialect.name, SNAPSHOT_GRANULARITY, PortfolioSnapshot.timestamp)
+        conn.execute(
+            PortfolioSnapshot.__table__.update()
+            .where(PortfolioSnapshot.period_start.is_(None))
+            .values(period_start=period)
+        )
+        conn.execute(text("""
+            DELETE FROM portfolio_snapshots
+            WHERE id NOT IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY user_id, period_start ORDER BY timestamp DESC, id DESC
+                    ) AS rank
+                    FROM portfolio_snapshots
+                ) ranked
+                WHERE rank = 1
+            )
+        """))
+        if engine.dialect.name == "postgresql":
+            conn.execute(text("ALTER TABLE portfolio_snapshots ALTER COLUMN period_start SET NOT NULL"))
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ux_portfolio_snapshots_user_period "
+            "ON portfolio_snapshots (user_id, period_start)"
+        ))
+
+
+MIGRATIONS = {
+    "transaction-dates": migrate_transaction_dates,
+    "expense-months": migrate_expense_months,
+    "transaction-keyset-indexes": migrate_transaction_keyset_indexes,
+    "snapshot-history-index": migrate_snapshot_history_index,
+    "snapshot-periods": migrate_snapshot_periods,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply one-off schema migrations.")
+    parser.add_argument("migration", choices=sorted(MIGRATIONS))
+    args = parser.parse_args()
+    MIGRATIONS[args.migration]()
+    print(f"Applied migration '{args.migration}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,36 @@
-import xgboost as xgb
-import pickle
+from bisect import bisect_left
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import text
-from datetime import datetime
+from dates import parse_month
+from db_utils import chunked
+from model import Expense
+from model_registry import ModelRegistry, LEGACY_ARTIFACTS
 
-# Load the pre-trained XGBoost expense model (JSON)
-expense_model = xgb.Booster()
-expense_model.load_model("expense_model.json")
+EXPENSE_FEATURE_COLUMNS = [
+    "rent", "loan_repayment", "insurance", "groceries", "transport", "eating_out", "entertainment", "utilities", "healthcare", "education", "miscellaneous"
+]
+EXPENSE_MODEL_FEATURES = ["Lag_1", "Lag_2", "Lag_3"] + EXPENSE_FEATURE_COLUMNS
+SAVINGS_MODEL_FEATURES = EXPENSE_FEATURE_COLUMNS + ["income"]
+NOT_ENOUGH_DATA = "Not enough data for prediction. Please add at least 3 months of expenses for accurate predictions."
+BATCH_QUERY_SIZE = 1000
 
-# Load the pre-trained savings model (Pickle)
-with open("budget_model.pkl", "rb") as f:
-    budget_model = pickle.load(f)
+# Versioned expense and savings models; the legacy artifacts next to this file serve until a version is promoted
+model_registry = ModelRegistry()
+model_registry.register("expense", EXPENSE_MODEL_FEATURES, legacy_artifact=LEGACY_ARTIFACTS["expense"])
+model_registry.register("savings", SAVINGS_MODEL_FEATURES, legacy_artifact=LEGACY_ARTIFACTS["savings"])
 
 def get_lag_features(user_id: int, month: str, db: Session):
     """Fetch the last 3 months' total_expense for lag features."""
-    month_dt = datetime.strptime(month, "%b-%Y")
     query = text("""
-        SELECT total_expense, month 
-        FROM expenses 
-        WHERE user_id = :user_id 
-        AND month < :month 
-        ORDER BY month DESC 
+        SELECT total_expense
+        FROM expenses
+        WHERE user_id = :user_id
+        AND month_start < :month_start
+        ORDER BY month_start DESC
         LIMIT 3
     """)
-    result = db.execute(query, {"user_id": user_id, "month": month}).fetchall()
+    result = db.execute(query, {"user_id": user_id, "month_start": parse_month(month)}).fetchall()
     lags = [row[0] for row in result] + [0] * (3 - len(result))
     return lags
 
@@ -33,31 +40,101 @@ def get_expense_features(user_id: int, month: str, db: Session):
                entertainment, utilities, healthcare, education, miscellaneous 
         FROM expenses 
         WHERE user_id = :user_id 
-        AND month = :month
+        AND month_start = :month_start
     """)
-    result = db.execute(query, {"user_id": user_id, "month": month}).fetchone()
+    result = db.execute(query, {"user_id": user_id, "month_start": parse_month(month)}).fetchone()
     if result:
         return result
     return (0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0)
 
-def predict_expense(user_id: int, month: str, db: Session):
+def predict_expense(user_id: int, month: str, db: Session, version: str = None):
     """Predict Total_Expense using the expense model."""
     lags = get_lag_features(user_id, month, db)
     # If not enough lag data, return a friendly error
     if len([lag for lag in lags if lag != 0]) < 3:
-        return {
-            "error": "Not enough data for prediction. Please add at least 3 months of expenses for accurate predictions."
-        }
+        return {"error": NOT_ENOUGH_DATA}
     features = lags + list(get_expense_features(user_id, month, db))
-    dmatrix = xgb.DMatrix([features], feature_names=["Lag_1", "Lag_2", "Lag_3"] + [
-        "rent", "loan_repayment", "insurance", "groceries", "transport", "eating_out", "entertainment", "utilities", "healthcare", "education", "miscellaneous"
-    ])
-    prediction = expense_model.predict(dmatrix)[0]
+    prediction = model_registry.get("expense", version).predictor.predict(features)
     return prediction
 
-def predict_savings(user_id: int, month: str, income: float, db: Session):
+def predict_savings(user_id: int, month: str, income: float, db: Session, version: str = None):
     """Predict Desired_Savings using the budget model."""
     features = list(get_expense_features(user_id, month, db)) + [income]
-    dmatrix = xgb.DMatrix([features])
-    prediction = budget_model.predict(dmatrix)[0]
+    prediction = model_registry.get("savings", version).predictor.predict(features)
     return prediction
+
+def _expense_history(user_ids, db: Session):
+    """Load every expense month of the given users: {user_id: (sorted month_starts, rows)}."""
+    # Selected through the model so month_start comes back as a date on every dialect
+    columns = [Expense.user_id, Expense.month_start, Expense.total_expense]
+    columns += [getattr(Expense, column) for column in EXPENSE_FEATURE_COLUMNS]
+    history = {}
+    for batch in chunked(sorted(set(user_ids)), BATCH_QUERY_SIZE):
+        query = select(*columns).where(Expense.user_id.in_(batch)).order_by(Expense.user_id, Expense.month_start)
+        for row in db.execute(query):
+            months, rows = history.setdefault(row[0], ([], []))
+            months.append(row[1])
+            rows.append(row[2:])
+    return history
+
+
+def _batch_features(items, db: Session):
+    """Yield (lags, expense features) or a ValueError per (user_id, month) item, mirroring the single-row queries."""
+    history = _expense_history([user_id for user_id, month in items], db)
+    for user_id, month in items:
+        try:
+            month_start = parse_month(month)
+        except ValueError as e:
+            yield e
+            continue
+        months, rows = history.get(user_id, ([], []))
+        position = bisect_left(months, month_start)
+        lags = [rows[i][0] for i in range(position - 1, max(position - 4, -1), -1)]
+        lags += [0] * (3 - len(lags))
+        if position < len(months) and months[position] == month_start:
+            features = tuple(rows[position][1:])
+        else:
+            features = (0,) * len(EXPENSE_FEATURE_COLUMNS)
+        yield lags, features
+
+
+def predict_expense_batch(items, db: Session, version: str = None):
+    """Predict Total_Expense for many (user_id, month) pairs with one query and one model call.
+
+    Returns one {"prediction": value} or {"error": message} per item, in order.
+    """
+    predictor = model_registry.get("expense", version).predictor
+    results, rows, positions = [], [], []
+    for features in _batch_features(items, db):
+        if isinstance(features, ValueError):
+            results.append({"error": str(features)})
+            continue
+        lags, expense_features = features
+        if len([lag for lag in lags if lag != 0]) < 3:
+            results.append({"error": NOT_ENOUGH_DATA})
+            continue
+        positions.append(len(results))
+        results.append(None)
+        rows.append(lags + list(expense_features))
+    if rows:
+        for position, prediction in zip(positions, predictor.predict_many(rows)):
+            results[position] = {"prediction": float(prediction)}
+    return results
+
+
+def predict_savings_batch(items, db: Session, version: str = None):
+    """Predict Desired_Savings for many (user_id, month, income) items with one query and one model call."""
+    predictor = model_registry.get("savings", version).predictor
+    results, rows, positions = [], [], []
+    features = _batch_features([(user_id, month) for user_id, month, income in items], db)
+    for (user_id, month, income), item_features in zip(items, features):
+        if isinstance(item_features, ValueError):
+            results.append({"error": str(item_features)})
+            continue
+        positions.append(len(results))
+        results.append(None)
+        rows.append(list(item_features[1]) + [income])
+    if rows:
+        for position, prediction in zip(positions, predictor.predict_many(rows)):
+            results[position] = {"prediction": float(prediction)}
+    return results
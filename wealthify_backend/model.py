@@ -1,8 +1,8 @@
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, Float, Boolean, DateTime, func
+from sqlalchemy import create_engine, Column, Integer, String, ForeignKey, Float, Boolean, Date, DateTime, Index, func
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 from dotenv import load_dotenv
 import os
-from datetime import datetime
+from datetime import datetime, timezone
 
 # ✅ Load environment variables
 load_dotenv()
@@ -36,6 +36,7 @@ class Expense(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     month = Column(String, nullable=False)
+    month_start = Column(Date, nullable=False)  # first day of `month`, used for ordering and uniqueness
     rent = Column(Float, default=0.0)
     loan_repayment = Column(Float, default=0.0)
     insurance = Column(Float, default=0.0)
@@ -49,6 +50,11 @@ class Expense(Base):
     miscellaneous = Column(Float, default=0.0)
     total_expense = Column(Float, default=0.0)
 
+    __table_args__ = (
+        # One row per user and month; also serves "last N months" range reads
+        Index("ux_expenses_user_month_start", user_id, month_start, unique=True),
+    )
+
 # ✅ Transaction model
 class Transaction(Base):
     __tablename__ = "transactions"
@@ -58,8 +64,37 @@ class Transaction(Base):
     description = Column(String, nullable=False)
     amount = Column(Float, nullable=False)
     category = Column(String, nullable=False)
-    date = Column(String, nullable=False)
-    created_at = Column(String, default=lambda: datetime.now().isoformat())
+    date = Column(Date, nullable=False)
+    # Set in Python so SQLite stores it in the same format keyset cursors are bound in
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), server_default=func.now())
+
+    __table_args__ = (
+        # Month filters become range scans on (user_id, type, date)
+        Index("ix_transactions_user_type_date", user_id, type, date),
+        Index("ix_transactions_user_category_date", user_id, category, date),
+        # Recent-first listings and keyset pages walk (user_id, created_at DESC, id DESC)
+        Index("ix_transactions_user_created_at", user_id, created_at.desc(), id.desc()),
+    )
+
+# ✅ Monthly transaction rollup model (running sums per user/month/type/category)
+class TransactionRollup(Base):
+    __tablename__ = "transaction_rollups"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(String, primary_key=True)  # "YYYY-MM"
+    type = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    tx_count = Column(Integer, nullable=False, default=0)
+
+# ✅ Lifetime ledger summary model (running totals per user)
+class LedgerSummary(Base):
+    __tablename__ = "ledger_summaries"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_income = Column(Float, nullable=False, default=0.0)
+    total_expenses = Column(Float, nullable=False, default=0.0)
+    balance = Column(Float, nullable=False, default=0.0)
+    tx_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 # ✅ Feedback model
 class Feedback(Base):
@@ -83,6 +118,14 @@ class Asset(Base):
 
     user = relationship("User", back_populates="assets")
 
+# ✅ Shared market price model (one row per distinct held symbol)
+class Price(Base):
+    __tablename__ = 'prices'
+    symbol = Column(String, primary_key=True)
+    type = Column(String, primary_key=True)
+    price = Column(Float, nullable=False)
+    fetched_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
 # ✅ Portfolio snapshot model
 class PortfolioSnapshot(Base):
     __tablename__ = 'portfolio_snapshots'
@@ -90,9 +133,18 @@ class PortfolioSnapshot(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     value = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow)
+    # Start of the SNAPSHOT_GRANULARITY period the snapshot belongs to (see snapshots.py)
+    period_start = Column(DateTime, nullable=False)
 
     user = relationship("User", back_populates="snapshots")
 
+    __table_args__ = (
+        # History reads and retention scan one user's snapshots in time order
+        Index("ix_portfolio_snapshots_user_timestamp", user_id, timestamp),
+        # At most one snapshot per user and period; writes upsert on it
+        Index("ux_portfolio_snapshots_user_period", user_id, period_start, unique=True),
+    )
+
 # ✅ Creates tables if not present
 Base.metadata.create_all(bind=engine)
 
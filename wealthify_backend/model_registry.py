@@ -0,0 +1,409 @@
+"""
+Versioned model registry with hot reloads.
+
+Artifacts live under MODEL_REGISTRY_DIR (default: `models/` next to this
+file), one directory per model version:
+
+    models/<name>/<version>/metadata.json   {"artifact": "model.json", "format": "json", ...}
+    models/<name>/<version>/<artifact>
+    models/<name>/active.json               {"version": "...", "previous": [...]}
+
+Boosters are stored in XGBoost's binary UBJSON format (`"format": "ubj"`)
+with a `"sha256"` of the artifact; every registry version must carry one.
+The loader reads the file once, verifies the checksum of those bytes and
+parses the same buffer, so what is checked is exactly what is loaded.
+Pickles execute code on load and are never accepted for registry
+versions.
+
+The legacy artifacts next to this file are available as version
+"legacy" and stay active until another version is promoted. A converted
+`<stem>.ubj` (with its `<stem>.ubj.sha256` written by convert_models.py)
+is preferred over the original file; a legacy pickle without one still
+loads, with a warning. Versions are loaded and warmed before they are
+swapped in with a single reference assignment, so in-flight predictions
+finish on the version they started with. Every worker polls
+`active.json`, so a promotion made through one worker reaches all of
+them within MODEL_REGISTRY_POLL_SECONDS.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import numpy as np
+import xgboost as xgb
+
+from inference import FeatureSpec, CompiledPredictor
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", os.path.join(BASE_DIR, "models"))
+MODEL_REGISTRY_POLL_SECONDS = float(os.getenv("MODEL_REGISTRY_POLL_SECONDS", 10))
+# Loaded versions kept per model besides the active one, for pinned requests
+MODEL_REGISTRY_CACHE_SIZE = int(os.getenv("MODEL_REGISTRY_CACHE_SIZE", 2))
+LEGACY_VERSION = "legacy"
+# Artifacts shipped next to this file, served as the "legacy" version of each model
+LEGACY_ARTIFACTS = {"expense": "expense_model.json", "savings": "budget_model.pkl"}
+# Formats of the legacy artifacts, by file extension
+LEGACY_FORMATS = {".json": "json", ".ubj": "ubj", ".pkl": "pickle"}
+
+
+class ModelVersionNotFound(LookupError):
+    pass
+
+
+class ArtifactChecksumError(ValueError):
+    pass
+
+
+class LoadedModel:
+    """One loaded and warmed model version."""
+
+    def __init__(self, name: str, version: str, metadata: dict, model, spec: FeatureSpec):
+        self.name = name
+        self.version = version
+        self.metadata = metadata
+        self.model = model
+        self.predictor = CompiledPredictor(model, spec)
+        self.loaded_at = datetime.now(timezone.utc)
+
+    def warm(self):
+        """Run one prediction so lazy initialisation happens before the version serves traffic."""
+        booster = self.predictor.booster
+        booster.inplace_predict(np.zeros((1, booster.num_features()), dtype=np.float32))
+
+
+def _write_json_atomic(path: str, data: dict):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def read_checksum(path: str):
+    """The checksum recorded in `<path>.sha256`, or None."""
+    try:
+        with open(path + ".sha256") as f:
+            return f.read().split()[0]
+    except (FileNotFoundError, IndexError):
+        return None
+
+
+def _load_booster(path: str, sha256: str = None) -> xgb.Booster:
+    """Load a booster file, verifying its checksum on the bytes that are then parsed."""
+    with open(path, "rb") as f:
+        data = bytearray(f.read())
+    if sha256 is not None and hashlib.sha256(data).hexdigest() != sha256:
+        raise ArtifactChecksumError(f"Checksum mismatch for model artifact {path}")
+    booster = xgb.Booster()
+    booster.load_model(data)
+    return booster
+
+
+def load_artifact(path: str, fmt: str, sha256: str = None, legacy: bool = False):
+    """Load a model artifact of the given format.
+
+    Every artifact must match its checksum, except the original legacy files
+    shipped with the repo, which are also the only ones that may be pickles.
+    """
+    if sha256 is None and not legacy:
+        raise ArtifactChecksumError(f"Model artifact {path} has no sha256 checksum")
+    if fmt in ("ubj", "json"):
+        return _load_booster(path, sha256)
+    if fmt == "pickle" and legacy:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    raise ValueError(f"Unsupported model format '{fmt}'")
+
+
+def write_checksum(path: str) -> str:
+    """Write `<path>.sha256` atomically and return the digest."""
+    digest = file_sha256(path)
+    sidecar = path + ".sha256"
+    with open(sidecar + ".tmp", "w") as f:
+        f.write(f"{digest}  {os.path.basename(path)}\n")
+    os.replace(sidecar + ".tmp", sidecar)
+    return digest
+
+
+def publish_version(root: str, name: str, version: str, booster: xgb.Booster, **metadata) -> str:
+    """Write a booster as registry version `version` of `name` (UBJSON plus checksummed metadata)."""
+    version_dir = os.path.join(root, name, version)
+    if os.path.exists(version_dir):
+        raise FileExistsError(f"Model '{name}' already has a version '{version}'")
+    os.makedirs(version_dir)
+    artifact = os.path.join(version_dir, "model.ubj")
+    booster.save_model(artifact)
+    metadata = {
+        "artifact": "model.ubj",
+        "format": "ubj",
+        "sha256": file_sha256(artifact),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        **metadata,
+    }
+    # metadata.json last: a version only becomes visible once it is complete
+    _write_json_atomic(os.path.join(version_dir, "metadata.json"), metadata)
+    return version_dir
+
+
+@contextmanager
+def _file_lock(path: str):
+    """Hold an exclusive lock on `path` across processes (and threads)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ModelRegistry:
+    def __init__(self, root: str = MODEL_REGISTRY_DIR, legacy_dir: str = BASE_DIR):
+        self.root = root
+        self.legacy_dir = legacy_dir
+        self._specs = {}
+        self._legacy = {}
+        self._active = {}  # name -> LoadedModel; replaced wholesale on swap
+        self._cache = {}  # name -> OrderedDict(version -> LoadedModel)
+        self._lock = threading.RLock()
+        self._watcher = None
+
+    def _model_dir(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def _pointer_path(self, name: str) -> str:
+        return os.path.join(self._model_dir(name), "active.json")
+
+    def _pointer_lock(self, name: str):
+        # Serialises read-modify-write of active.json between workers so no promotion is lost
+        return _file_lock(os.path.join(self._model_dir(name), "active.json.lock"))
+
+    def _read_pointer(self, name: str) -> dict:
+        try:
+            with open(self._pointer_path(name)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def metadata(self, name: str, version: str) -> dict:
+        if name not in self._specs:
+            raise ModelVersionNotFound(f"Unknown model '{name}'")
+        if version == LEGACY_VERSION and self._legacy.get(name):
+            return self._legacy_metadata(name)
+        # Never let a version name step outside the model's directory
+        if not version or version.startswith(".") or os.sep in version or "/" in version:
+            raise ModelVersionNotFound(f"Model '{name}' has no version '{version}'")
+        version_dir = os.path.join(self._model_dir(name), version)
+        try:
+            with open(os.path.join(version_dir, "metadata.json")) as f:
+                metadata = json.load(f)
+        except FileNotFoundError:
+            raise ModelVersionNotFound(f"Model '{name}' has no version '{version}'")
+        metadata["artifact"] = os.path.join(version_dir, metadata["artifact"])
+        return metadata
+
+    def _legacy_metadata(self, name: str) -> dict:
+        artifact = os.path.join(self.legacy_dir, self._legacy[name])
+        binary = os.path.splitext(artifact)[0] + ".ubj"
+        if os.path.exists(binary):
+            sha256 = read_checksum(binary)
+            if sha256 is not None:
+                return {"artifact": binary, "format": "ubj", "sha256": sha256}
+            # e.g. a conversion interrupted before its checksum was written
+            logger.warning(
+                "%s has no .sha256 checksum; loading %s instead",
+                os.path.basename(binary), os.path.basename(artifact),
+            )
+        return {"artifact": artifact, "format": LEGACY_FORMATS[os.path.splitext(artifact)[1]]}
+
+    def versions(self, name: str):
+        """Known versions of a model, oldest first."""
+        versions = []
+        legacy = self._legacy.get(name)
+        if legacy and any(
+            os.path.exists(os.path.join(self.legacy_dir, artifact))
+            for artifact in (legacy, os.path.splitext(legacy)[0] + ".ubj")
+        ):
+            versions.append(LEGACY_VERSION)
+        model_dir = self._model_dir(name)
+        if os.path.isdir(model_dir):
+            versions += sorted(
+                entry for entry in os.listdir(model_dir)
+                if os.path.isfile(os.path.join(model_dir, entry, "metadata.json"))
+            )
+        return versions
+
+    def _configured_version(self, name: str) -> str:
+        version = self._read_pointer(name).get("version")
+        if version:
+            return version
+        versions = self.versions(name)
+        if not versions:
+            raise ModelVersionNotFound(f"Model '{name}' has no versions")
+        return LEGACY_VERSION if LEGACY_VERSION in versions else versions[-1]
+
+    def _load(self, name: str, version: str) -> LoadedModel:
+        metadata = self.metadata(name, version)
+        if metadata["format"] == "pickle":
+            logger.warning(
+                "Loading %s with pickle; run convert_models.py to produce a checksummed .ubj artifact",
+                os.path.basename(metadata["artifact"]),
+            )
+        model = load_artifact(
+            metadata["artifact"], metadata["format"], metadata.get("sha256"),
+            legacy=version == LEGACY_VERSION,
+        )
+        loaded = LoadedModel(name, version, metadata, model, self._specs[name])
+        loaded.warm()
+        return loaded
+
+    def _remember(self, loaded: LoadedModel):
+        cache = self._cache.setdefault(loaded.name, OrderedDict())
+        cache[loaded.version] = loaded
+        cache.move_to_end(loaded.version)
+        while len(cache) > MODEL_REGISTRY_CACHE_SIZE:
+            cache.popitem(last=False)
+
+    def register(self, name: str, features, legacy_artifact: str = None):
+        """Declare a model and load its active version."""
+        self._specs[name] = FeatureSpec(features)
+        self._legacy[name] = legacy_artifact
+        self._activate(name, self._configured_version(name))
+
+    def _activate(self, name: str, version: str) -> LoadedModel:
+        loaded = self._cached(name, version) or self._load(name, version)
+        with self._lock:
+            previous = self._active.get(name)
+            active = dict(self._active)
+            active[name] = loaded
+            self._active = active
+            if previous is not None and previous.version != version:
+                self._remember(previous)
+            self._cache.get(name, {}).pop(version, None)
+        logger.info("Model %s now serving version %s", name, version)
+        return loaded
+
+    def _cached(self, name: str, version: str):
+        with self._lock:
+            active = self._active.get(name)
+            if active is not None and active.version == version:
+                return active
+            return self._cache.get(name, {}).get(version)
+
+    def active_version(self, name: str) -> str:
+        return self._active[name].version
+
+    def get(self, name: str, version: str = None) -> LoadedModel:
+        """The active version of a model, or a pinned version (loaded on first use)."""
+        if version is None:
+            return self._active[name]
+        loaded = self._cached(name, version)
+        if loaded is None:
+            # Requested versions come from clients; only names the registry lists reach the filesystem
+            if version not in self.versions(name):
+                raise ModelVersionNotFound(f"Model '{name}' has no version '{version}'")
+            loaded = self._load(name, version)
+            with self._lock:
+                self._remember(loaded)
+        return loaded
+
+    def describe(self):
+        """Every registered model with its versions, metadata and serving state."""
+        described = {}
+        for name in self._specs:
+            active = self._active.get(name)
+            cached = self._cache.get(name, {})
+            entries = []
+            for version in self.versions(name):
+                metadata = self.metadata(name, version)
+                metadata["artifact"] = os.path.basename(metadata["artifact"])
+                entries.append({
+                    "version": version,
+                    "active": active is not None and active.version == version,
+                    "loaded": (active is not None and active.version == version) or version in cached,
+                    "metadata": metadata,
+                })
+            described[name] = {"active": active.version if active else None, "versions": entries}
+        return described
+
+    def promote(self, name: str, version: str) -> LoadedModel:
+        """Load and warm a version, make it active here and record it for the other workers."""
+        if version not in self.versions(name):
+            raise ModelVersionNotFound(f"Model '{name}' has no version '{version}'")
+        loaded = self._activate(name, version)
+        with self._pointer_lock(name):
+            pointer = self._read_pointer(name)
+            current = pointer.get("version")
+            previous = pointer.get("previous", [])
+            if current and current != version:
+                previous = previous + [current]
+            elif not current and version != LEGACY_VERSION and LEGACY_VERSION in self.versions(name):
+                previous = previous + [LEGACY_VERSION]
+            _write_json_atomic(self._pointer_path(name), {"version": version, "previous": previous[-20:]})
+        return loaded
+
+    def rollback(self, name: str) -> LoadedModel:
+        """Return to the version that was active before the last promotion."""
+        with self._pointer_lock(name):
+            pointer = self._read_pointer(name)
+            previous = pointer.get("previous", [])
+            if not previous:
+                raise ModelVersionNotFound(f"Model '{name}' has no earlier version to roll back to")
+            version = previous[-1]
+            loaded = self._activate(name, version)
+            _write_json_atomic(self._pointer_path(name), {"version": version, "previous": previous[:-1]})
+        return loaded
+
+    def sync(self):
+        """Swap in any version another worker promoted since the last check."""
+        for name in list(self._specs):
+            try:
+                version = self._configured_version(name)
+                if self._active.get(name) is None or self._active[name].version != version:
+                    self._activate(name, version)
+            except Exception:
+                logger.warning("Could not reload model %s", name, exc_info=True)
+
+    def _watch(self):
+        while True:
+            time.sleep(MODEL_REGISTRY_POLL_SECONDS)
+            self.sync()
+
+    def start_watching(self):
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, name="model-registry", daemon=True)
+            self._watcher.start()
@@ -0,0 +1,178 @@
+"""
+Price providers.
+
+Every provider turns resolved tickers (see pricing.resolve_ticker) into
+prices. Yahoo is the production source; the replay and random-walk
+providers need no network so portfolio endpoints and scheduler jobs can
+be load-tested and benchmarked offline. Select one with PRICE_PROVIDER:
+
+    yahoo        - live quotes from yfinance (default)
+    replay       - recorded prices from PRICE_REPLAY_PATH (.csv or .parquet)
+                   with columns ticker, price and optionally timestamp
+    random_walk  - seeded synthetic prices (PRICE_RANDOM_SEED)
+"""
+
+import math
+import os
+import random
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Optional
+import pandas as pd
+
+# Per-request timeout and parallelism for live quote fetches
+QUOTE_TIMEOUT = float(os.getenv("QUOTE_TIMEOUT", 5))
+QUOTE_WORKERS = int(os.getenv("QUOTE_WORKERS", 8))
+
+
+class PriceProvider(ABC):
+    """Source of prices for resolved tickers."""
+
+    @abstractmethod
+    def fetch(self, ticker: str) -> Optional[float]:
+        """Latest price of one ticker; None when it fails or is unknown."""
+
+    def fetch_many(self, tickers) -> dict:
+        """Prices for many tickers as {ticker: price or None}.
+
+        Tickers that could not be answered in time may be left out, so
+        callers do not cache them as failures.
+        """
+        return {ticker: self.fetch(ticker) for ticker in set(tickers)}
+
+
+class YahooPriceProvider(PriceProvider):
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=QUOTE_WORKERS, thread_name_prefix="quote-fetch")
+
+    def fetch(self, ticker):
+        import yfinance as yf
+        try:
+            hist = yf.Ticker(ticker).history(period='1d', timeout=QUOTE_TIMEOUT)
+            if not hist.empty:
+                return float(hist['Close'].iloc[-1])
+        except Exception:
+            pass
+        return None
+
+    @staticmethod
+    def _last_closes(frame, tickers):
+        closes = {}
+        for ticker in tickers:
+            try:
+                if isinstance(frame.columns, pd.MultiIndex):
+                    column = frame[ticker]["Close"]
+                elif len(tickers) == 1:
+                    column = frame["Close"]
+                else:
+                    continue
+            except KeyError:
+                continue
+            column = column.dropna()
+            if not column.empty:
+                closes[ticker] = float(column.iloc[-1])
+        return closes
+
+    def fetch_many(self, tickers):
+        """Request everything in one batched download, then retry what is missing concurrently.
+
+        The fallback runs on a bounded pool and is cut off after
+        QUOTE_TIMEOUT so one slow quote cannot hold up the rest.
+        """
+        import yfinance as yf
+        tickers = sorted(set(tickers))
+        if not tickers:
+            return {}
+        prices = {}
+        try:
+            frame = yf.download(
+                tickers, period='1d', group_by='ticker', progress=False,
+                threads=min(len(tickers), QUOTE_WORKERS), timeout=QUOTE_TIMEOUT,
+            )
+            if frame is not None and not frame.empty:
+                prices = self._last_closes(frame, tickers)
+        except Exception:
+            pass
+
+        missing = [ticker for ticker in tickers if ticker not in prices]
+        futures = {self._executor.submit(self.fetch, ticker): ticker for ticker in missing}
+        done, _ = wait(futures, timeout=QUOTE_TIMEOUT)
+        for future in done:
+            prices[futures[future]] = future.result()
+        return prices
+
+
+class ReplayPriceProvider(PriceProvider):
+    """Replays recorded prices from a CSV or Parquet file.
+
+    With a timestamp column each ticker's prices are returned in time
+    order, one per fetch, wrapping around at the end; without one the
+    last recorded price is returned every time.
+    """
+
+    def __init__(self, path: str):
+        if path.endswith(".parquet"):
+            frame = pd.read_parquet(path)
+        else:
+            frame = pd.read_csv(path)
+        if "timestamp" in frame.columns:
+            frame = frame.sort_values("timestamp", kind="stable")
+        self._series = {
+            ticker: group["price"].astype(float).tolist()
+            for ticker, group in frame.groupby("ticker", sort=False)
+        }
+        self._replay = "timestamp" in frame.columns
+        self._positions = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, ticker):
+        series = self._series.get(ticker)
+        if not series:
+            return None
+        if not self._replay:
+            return series[-1]
+        with self._lock:
+            position = self._positions.get(ticker, 0)
+            self._positions[ticker] = position + 1
+        return series[position % len(series)]
+
+
+class RandomWalkPriceProvider(PriceProvider):
+    """Deterministic geometric random walk per ticker.
+
+    Each ticker gets its own generator seeded from the ticker name and
+    PRICE_RANDOM_SEED, so runs are reproducible regardless of the order
+    in which tickers are requested.
+    """
+
+    def __init__(self, seed: int = 0, volatility: float = 0.01):
+        self.seed = seed
+        self.volatility = volatility
+        self._walks = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, ticker):
+        with self._lock:
+            walk = self._walks.get(ticker)
+            if walk is None:
+                rng = random.Random(zlib.crc32(ticker.encode()) ^ self.seed)
+                walk = self._walks[ticker] = [rng, rng.uniform(10.0, 1000.0)]
+            rng, price = walk
+            walk[1] = price * math.exp(rng.gauss(0.0, self.volatility))
+            return walk[1]
+
+
+def provider_from_env() -> PriceProvider:
+    name = os.getenv("PRICE_PROVIDER", "yahoo")
+    if name == "yahoo":
+        return YahooPriceProvider()
+    if name == "replay":
+        path = os.getenv("PRICE_REPLAY_PATH")
+        if not path:
+            raise ValueError("PRICE_PROVIDER=replay requires PRICE_REPLAY_PATH")
+        return ReplayPriceProvider(path)
+    if name == "random_walk":
+        return RandomWalkPriceProvider(seed=int(os.getenv("PRICE_RANDOM_SEED", 0)))
+    raise ValueError(f"Unknown PRICE_PROVIDER '{name}'")
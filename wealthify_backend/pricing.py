@@ -0,0 +1,145 @@
+"""
+Asset prices with an in-process cache in front of the configured provider.
+
+Prices are cached per resolved ticker with a TTL that depends on the
+market (crypto moves faster than NSE or US stocks). Expired entries are
+still served for a grace period while a background thread refreshes
+them, and tickers that fail to resolve are cached negatively so they
+are not retried on every request.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from price_providers import PriceProvider, provider_from_env
+
+PRICE_TTLS = {
+    "crypto": int(os.getenv("PRICE_TTL_CRYPTO", 60)),
+    "nse": int(os.getenv("PRICE_TTL_NSE", 300)),
+    "us": int(os.getenv("PRICE_TTL_US", 300)),
+}
+# How long past its TTL an entry may still be served while it is refreshed
+PRICE_STALE_TTL = int(os.getenv("PRICE_STALE_TTL", 3600))
+# How long a failed or unknown ticker is remembered before it is tried again
+PRICE_NEGATIVE_TTL = int(os.getenv("PRICE_NEGATIVE_TTL", 900))
+PRICE_REFRESH_WORKERS = int(os.getenv("PRICE_REFRESH_WORKERS", 4))
+
+
+def resolve_ticker(symbol: str, asset_type: str):
+    """Map an asset to its ticker and market, or (None, None) if it has no live price.
+
+    Tickers follow Yahoo's conventions for every provider, so recorded
+    Yahoo prices can be replayed as-is.
+    """
+    if asset_type == "crypto":
+        return f"{symbol}-INR", "crypto"
+    if asset_type == "stock":
+        # Assume Indian stocks unless symbol is all uppercase (US stock)
+        if symbol.isupper():
+            return symbol, "us"
+        return f"{symbol}.NS", "nse"
+    return None, None  # For mutual funds/cash, no live price
+
+
+class PriceCache:
+    def __init__(self, provider: PriceProvider):
+        self.provider = provider
+        self._fetch = provider.fetch
+        self._fetch_many = provider.fetch_many
+        self._entries = {}  # ticker -> (price or None, fetched_at)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=PRICE_REFRESH_WORKERS, thread_name_prefix="price-refresh")
+
+    def _store(self, ticker: str, price: Optional[float]):
+        with self._lock:
+            self._entries[ticker] = (price, time.monotonic())
+
+    def _refresh(self, ticker: str):
+        try:
+            price = self._fetch(ticker)
+            # Keep serving the last good price if a background refresh fails
+            if price is not None or ticker not in self._entries:
+                self._store(ticker, price)
+        finally:
+            with self._lock:
+                self._refreshing.discard(ticker)
+
+    def _refresh_in_background(self, ticker: str):
+        with self._lock:
+            if ticker in self._refreshing:
+                return
+            self._refreshing.add(ticker)
+        self._executor.submit(self._refresh, ticker)
+
+    def _lookup(self, ticker: str, market: str):
+        """Return (usable, price) from the cache, scheduling a refresh for stale entries."""
+        entry = self._entries.get(ticker)
+        if entry is None:
+            return False, None
+        price, fetched_at = entry
+        age = time.monotonic() - fetched_at
+        if price is None:
+            return age < PRICE_NEGATIVE_TTL, None
+        if age < PRICE_TTLS[market]:
+            return True, price
+        if age < PRICE_TTLS[market] + PRICE_STALE_TTL:
+            self._refresh_in_background(ticker)
+            return True, price
+        return False, None
+
+    def get(self, ticker: str, market: str) -> Optional[float]:
+        """Return a cached price, refreshing it synchronously only when nothing usable is cached."""
+        usable, price = self._lookup(ticker, market)
+        if usable:
+            return price
+        price = self._fetch(ticker)
+        self._store(ticker, price)
+        return price
+
+    def get_many(self, tickers) -> dict:
+        """Resolve {ticker: market} at once; all cache misses are fetched in a single batch."""
+        prices, misses = {}, []
+        for ticker, market in tickers.items():
+            usable, price = self._lookup(ticker, market)
+            if usable:
+                prices[ticker] = price
+            else:
+                misses.append(ticker)
+        fetched = self._fetch_many(misses)
+        for ticker in misses:
+            if ticker in fetched:
+                self._store(ticker, fetched[ticker])
+            prices[ticker] = fetched.get(ticker)
+        return prices
+
+
+price_provider = provider_from_env()
+price_cache = PriceCache(price_provider)
+
+
+def fetch_price(symbol: str, asset_type: str) -> float:
+    """Current price of an asset, or 0.0 when it has no live price."""
+    ticker, market = resolve_ticker(symbol, asset_type)
+    if ticker is None:
+        return 0.0
+    price = price_cache.get(ticker, market)
+    return price if price is not None else 0.0
+
+
+def fetch_prices(assets) -> dict:
+    """Current prices for many (symbol, asset_type) pairs; duplicates are fetched once.
+
+    Returns {(symbol, asset_type): price}, with 0.0 for assets that have no live price.
+    """
+    resolved = {}
+    for symbol, asset_type in set(assets):
+        resolved[(symbol, asset_type)] = resolve_ticker(symbol, asset_type)
+    quotes = price_cache.get_many({ticker: market for ticker, market in resolved.values() if ticker is not None})
+    return {
+        pair: (quotes.get(ticker) or 0.0) if ticker is not None else 0.0
+        for pair, (ticker, market) in resolved.items()
+    }
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Per-user monthly transaction rollups.
+
+`transaction_rollups` holds running sums and counts keyed by
+(user_id, month, type, category). Writes that insert transactions call
+`apply_transactions` inside the same DB transaction; `backfill` rebuilds
+the table from raw transactions for existing data.
+
+Usage:
+    python rollup.py backfill [--user-id ID]
+"""
+
+import argparse
+from collections import defaultdict
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from model import SessionLocal, Transaction, TransactionRollup
+from db_utils import dialect_insert, chunked
+from cache import mark_dashboard_stale
+from ledger import apply_to_ledger
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def month_of(date) -> str:
+    """Return the "YYYY-MM" rollup key for a transaction date."""
+    return str(date)[:7]
+
+
+def _upsert(db: Session, rows):
+    """Add the given sums and counts onto existing rollup rows, inserting missing ones."""
+    insert = dialect_insert(db)
+    for batch in chunked(rows, BACKFILL_BATCH_SIZE):
+        stmt = insert(TransactionRollup).values(batch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "month", "type", "category"],
+            set_={
+                "total_amount": TransactionRollup.total_amount + stmt.excluded.total_amount,
+                "tx_count": TransactionRollup.tx_count + stmt.excluded.tx_count,
+            },
+        )
+        db.execute(stmt)
+
+
+def _fold(items):
+    """Fold (user_id, date, type, category, amount, count) tuples into rollup rows."""
+    sums = defaultdict(lambda: [0.0, 0])
+    for user_id, date, tx_type, category, amount, count in items:
+        entry = sums[(user_id, month_of(date), tx_type, category)]
+        entry[0] += float(amount)
+        entry[1] += int(count)
+    return [
+        {
+            "user_id": user_id,
+            "month": month,
+            "type": tx_type,
+            "category": category,
+            "total_amount": total_amount,
+            "tx_count": tx_count,
+        }
+        for (user_id, month, tx_type, category), (total_amount, tx_count) in sums.items()
+    ]
+
+
+def apply_transactions(db: Session, transactions):
+    """Record newly inserted transactions in the rollup and ledger tables.
+
+    Must be called in the same session as the insert so both are committed
+    (or rolled back) together. Also schedules the affected users' cached
+    dashboards for invalidation on commit. Accepts ORM objects or plain dicts.
+    """
+    items = []
+    for tx in transactions:
+        get = tx.get if isinstance(tx, dict) else lambda key: getattr(tx, key)
+        items.append((get("user_id"), get("date"), get("type"), get("category"), get("amount"), 1))
+    rows = _fold(items)
+    if rows:
+        _upsert(db, rows)
+        apply_to_ledger(db, [(user_id, tx_type, amount) for user_id, _, tx_type, _, amount, _ in items])
+    for user_id in {row["user_id"] for row in rows}:
+        mark_dashboard_stale(db, user_id)
+
+
+def backfill(db: Session, user_id=None) -> int:
+    """Rebuild rollup rows from raw transactions; returns the number of rows written."""
+    delete_query = db.query(TransactionRollup)
+    source = db.query(
+        Transaction.user_id,
+        Transaction.date,
+        Transaction.type,
+        Transaction.category,
+        func.sum(Transaction.amount),
+        func.count(Transaction.id),
+    )
+    if user_id is not None:
+        delete_query = delete_query.filter(TransactionRollup.user_id == user_id)
+        source = source.filter(Transaction.user_id == user_id)
+    delete_query.delete(synchronize_session=False)
+
+    # Grouping by the raw date keeps the SQL portable; days are folded into months here.
+    source = source.group_by(
+        Transaction.user_id, Transaction.date, Transaction.type, Transaction.category
+    ).yield_per(BACKFILL_BATCH_SIZE)
+    rows = _fold(source)
+    _upsert(db, rows)
+    for affected_user_id in {row["user_id"] for row in rows}:
+        mark_dashboard_stale(db, affected_user_id)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the transaction rollup table.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    backfill_parser = subparsers.add_parser("backfill", help="Rebuild rollups from raw transactions")
+    backfill_parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "backfill":
+            written = backfill(db, args.user_id)
+            db.commit()
+            print(f"Backfilled {written} rollup rows.")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
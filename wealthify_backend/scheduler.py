@@ -1,26 +1,180 @@
+"""
+Background jobs.
+
+Every API worker process starts this scheduler, so on PostgreSQL the
+workers elect a single leader through a session-level advisory lock held
+on a dedicated connection. Only the leader runs jobs; followers retry the
+lock periodically and take over when the leader's connection goes away.
+Each job also takes its own advisory lock, so a run can never overlap
+with one still in progress elsewhere (e.g. on a leader that just lost
+its lock). Other databases are assumed to be single-process and run the
+scheduler directly.
+"""
+
+import functools
+import logging
+import os
+import threading
+import time
+import zlib
 from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from datetime import datetime
-from model import SessionLocal, Asset, PortfolioSnapshot
+from model import SessionLocal, engine
+from ledger import repair
+from market_data import MARKET_DATA_REFRESH_SECONDS, refresh_prices
+from snapshots import take_daily_snapshots, compact_snapshots
+
+logger = logging.getLogger(__name__)
+
+# Advisory locks are taken as (namespace, key); key 0 is the leader lock
+SCHEDULER_LOCK_NAMESPACE = int(os.getenv("SCHEDULER_LOCK_NAMESPACE", 7419))
+LEADER_LOCK_KEY = 0
+# How often followers retry the leader lock and the leader checks its connection
+SCHEDULER_ELECTION_INTERVAL = float(os.getenv("SCHEDULER_ELECTION_INTERVAL", 15))
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") != "0"
 
 scheduler = BackgroundScheduler()
+_started = False
+
+
+def _lock_key(name: str) -> int:
+    return zlib.crc32(name.encode()) & 0x7FFFFFFF or 1
+
+
+def _lock_connection():
+    # Autocommit so a long-held lock connection never sits idle in a transaction
+    return engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+
+
+def _try_lock(conn, key: int) -> bool:
+    return bool(conn.execute(
+        text("SELECT pg_try_advisory_lock(:namespace, :key)"),
+        {"namespace": SCHEDULER_LOCK_NAMESPACE, "key": key},
+    ).scalar())
+
+
+def _release(conn, key: int):
+    """Unlock and close; a connection that cannot be unlocked is discarded so the lock dies with it."""
+    try:
+        conn.execute(
+            text("SELECT pg_advisory_unlock(:namespace, :key)"),
+            {"namespace": SCHEDULER_LOCK_NAMESPACE, "key": key},
+        )
+        conn.close()
+    except Exception:
+        conn.invalidate()
+
+
+def exclusive(name: str):
+    """Run the decorated job only if no other process is running it right now."""
+    def decorator(job):
+        @functools.wraps(job)
+        def wrapper():
+            if engine.dialect.name != "postgresql":
+                return job()
+            key = _lock_key(name)
+            conn = _lock_connection()
+            try:
+                if not _try_lock(conn, key):
+                    logger.info("Skipping %s: already running elsewhere", name)
+                    conn.close()
+                    return None
+            except Exception:
+                conn.invalidate()
+                raise
+            try:
+                return job()
+            finally:
+                _release(conn, key)
+        return wrapper
+    return decorator
+
 
 @scheduler.scheduled_job("cron", hour=0, minute=0)
+@exclusive("daily_snapshot")
 def daily_snapshot_job():
     db: Session = SessionLocal()
     try:
-        user_ids = db.query(Asset.user_id).distinct().all()
-        for (user_id,) in user_ids:
-            assets = db.query(Asset).filter(Asset.user_id == user_id).all()
-            total_value = sum(
-                float(getattr(asset, 'buy_price', 0.0)) * float(getattr(asset, 'quantity', 0.0))
-                for asset in assets
-            )
-            snapshot = PortfolioSnapshot(user_id=user_id, value=total_value)
-            db.add(snapshot)
+        # Value holdings at fresh market prices, then snapshot all users set-wise
+        refresh_prices(db)
         db.commit()
+        take_daily_snapshots(db)
+    finally:
+        db.close()
+
+@scheduler.scheduled_job("cron", hour=1, minute=0)
+@exclusive("snapshot_retention")
+def snapshot_retention_job():
+    db: Session = SessionLocal()
+    try:
+        compact_snapshots(db)
     finally:
         db.close()
 
+@scheduler.scheduled_job("interval", seconds=MARKET_DATA_REFRESH_SECONDS, next_run_time=datetime.now())
+@exclusive("market_data_refresh")
+def market_data_refresh_job():
+    db: Session = SessionLocal()
+    try:
+        refresh_prices(db)
+        db.commit()
+    finally:
+        db.close()
+
+@scheduler.scheduled_job("cron", hour=3, minute=0)
+@exclusive("ledger_repair")
+def ledger_repair_job():
+    db: Session = SessionLocal()
+    try:
+        repair(db)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _lead():
+    """Hold the leader lock for as long as its connection lives, running jobs meanwhile."""
+    conn = _lock_connection()
+    try:
+        elected = _try_lock(conn, LEADER_LOCK_KEY)
+    except Exception:
+        conn.invalidate()
+        raise
+    if not elected:
+        conn.close()
+        return
+    logger.info("Elected scheduler leader (pid %s)", os.getpid())
+    scheduler.resume()
+    try:
+        while True:
+            time.sleep(SCHEDULER_ELECTION_INTERVAL)
+            conn.execute(text("SELECT 1"))
+    except Exception:
+        logger.warning("Lost scheduler leadership", exc_info=True)
+    finally:
+        scheduler.pause()
+        # The lock is released when the server sees this connection close
+        conn.invalidate()
+
+
+def _election_loop():
+    while True:
+        try:
+            _lead()
+        except Exception:
+            logger.warning("Scheduler leader election failed", exc_info=True)
+        time.sleep(SCHEDULER_ELECTION_INTERVAL)
+
+
 def start_scheduler():
-    scheduler.start() 
\ No newline at end of file
+    global _started
+    if _started or not SCHEDULER_ENABLED:
+        return
+    _started = True
+    if engine.dialect.name != "postgresql":
+        scheduler.start()
+        return
+    scheduler.start(paused=True)
+    threading.Thread(target=_election_loop, name="scheduler-election", daemon=True).start()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, date
 
 # Schema for user registration input
 class UserCreate(BaseModel):
@@ -59,6 +59,23 @@ class PredictionResponse(BaseModel):
     prediction: float
     month: str
 
+# Schemas for batch predictions
+class ExpensePredictBatchInput(BaseModel):
+    items: List[ExpensePredictInput]
+
+class SavingsPredictBatchInput(BaseModel):
+    items: List[SavingsPredictionInput]
+
+class BatchPredictionResult(BaseModel):
+    user_id: int
+    month: str
+    prediction: Optional[float] = None
+    error: Optional[str] = None
+
+# Schema for promoting a model version
+class ModelPromoteInput(BaseModel):
+    version: str
+
 # Schema for transaction
 class TransactionCreate(BaseModel):
     user_id: int
@@ -66,7 +83,7 @@ class TransactionCreate(BaseModel):
     description: str
     amount: float
     category: str
-    date: str
+    date: date
 
 class TransactionResponse(TransactionCreate):
     id: int
@@ -124,6 +141,12 @@ class AssetResponse(AssentBase):
     class Config:
         orm_mode = True
 
+# schema for an asset with its current valuation
+class AssetValuationResponse(AssetResponse):
+    current_price: float
+    value: float
+    gain_loss: float
+
 # schema for portfolio snapshot response 
 class PortfolioSnapshotResponse(BaseModel):
     value: float
@@ -133,11 +156,19 @@ class PortfolioSnapshotResponse(BaseModel):
         orm_mode = True
 
 
+# schema for a portfolio history point; OHLC fields are set for bucketed resolutions
+class PortfolioHistoryPoint(PortfolioSnapshotResponse):
+    open: Optional[float] = None
+    high: Optional[float] = None
+    low: Optional[float] = None
+    close: Optional[float] = None
+
+
 #schema for portfolio overview response 
 class PortfolioOverviewResponse(BaseModel):
     total_value: float
     invested_total: float
     gain_loss: float
     percent_change: float
-    assets: List[AssetResponse]
+    assets: List[AssetValuationResponse]
 
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Portfolio snapshot jobs.
+
+The nightly snapshot reads a chunk of users' holdings joined to the
+shared `prices` table in one query, values them with the vectorized
+engine in valuation.py (holdings without a fresh market price count at
+their buy price) and upserts the per-user totals in bulk. Users can be
+split into shards (user_id % shard_count) so several workers can share
+the run.
+
+Snapshots are unique per (user, period_start), where the period is
+SNAPSHOT_GRANULARITY (hour, day, week or month; default day). Writing a
+snapshot again within the same period updates that row in place, so
+repeated page visits and job reruns do not add rows.
+
+Retention keeps the table from growing with every page view: raw
+snapshots older than SNAPSHOT_RAW_RETENTION_DAYS are thinned to the last
+one per day, and those older than SNAPSHOT_DAILY_RETENTION_DAYS to the
+last one per month.
+
+Usage:
+    python snapshots.py daily [--shard 0 --shards 4] [--chunk-size 50000]
+    python snapshots.py compact [--chunk-size 50000]
+"""
+
+import argparse
+import os
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from model import SessionLocal, Asset, Price, PortfolioSnapshot
+from market_data import PRICE_MAX_AGE, LIVE_PRICED_TYPES
+from db_utils import dialect_insert, chunked
+from valuation import value_holdings, totals_by_user
+from dates import PERIOD_UNITS, period_start
+
+SNAPSHOT_GRANULARITY = os.getenv("SNAPSHOT_GRANULARITY", "day")
+if SNAPSHOT_GRANULARITY not in PERIOD_UNITS:
+    raise ValueError(f"Unknown SNAPSHOT_GRANULARITY '{SNAPSHOT_GRANULARITY}', expected one of {', '.join(PERIOD_UNITS)}")
+SNAPSHOT_CHUNK_SIZE = int(os.getenv("SNAPSHOT_CHUNK_SIZE", 50000))
+UPSERT_BATCH_SIZE = 1000
+SNAPSHOT_RAW_RETENTION_DAYS = int(os.getenv("SNAPSHOT_RAW_RETENTION_DAYS", 30))
+SNAPSHOT_DAILY_RETENTION_DAYS = int(os.getenv("SNAPSHOT_DAILY_RETENTION_DAYS", 365))
+
+
+def _user_ranges(db: Session, column, chunk_size: int):
+    """Yield [lo, hi) user-id ranges of `chunk_size` covering every value of `column`."""
+    lo, hi = db.query(func.min(column), func.max(column)).one()
+    if lo is None:
+        return
+    for start in range(lo, hi + 1, chunk_size):
+        yield start, start + chunk_size
+
+
+def truncate_timestamp(dialect: str, unit: str, column):
+    """SQL equivalent of dates.period_start for the given dialect."""
+    if dialect == "postgresql":
+        return func.date_trunc(unit, column)
+    # SQLite compares DateTime values as text, so match SQLAlchemy's storage format exactly
+    formats = {
+        "hour": ("%Y-%m-%d %H:00:00.000000",),
+        "day": ("%Y-%m-%d 00:00:00.000000",),
+        "week": ("%Y-%m-%d 00:00:00.000000", "weekday 0", "-6 days"),
+        "month": ("%Y-%m-01 00:00:00.000000",),
+    }
+    fmt, *modifiers = formats[unit]
+    return func.strftime(fmt, column, *modifiers)
+
+
+def _on_period_conflict(stmt):
+    """Turn an INSERT into a snapshot into an update of that user's snapshot for the same period."""
+    return stmt.on_conflict_do_update(
+        index_elements=["user_id", "period_start"],
+        set_={"value": stmt.excluded.value, "timestamp": stmt.excluded.timestamp},
+    )
+
+
+def upsert_snapshot(db: Session, user_id: int, value: float, taken_at: datetime = None):
+    """Record a user's portfolio value for the current period, replacing an earlier one from the same period."""
+    taken_at = taken_at or datetime.utcnow()
+    insert = dialect_insert(db)
+    db.execute(_on_period_conflict(insert(PortfolioSnapshot).values(
+        user_id=user_id,
+        value=value,
+        timestamp=taken_at,
+        period_start=period_start(taken_at, SNAPSHOT_GRANULARITY),
+    )))
+
+
+def _snapshot_chunk(db: Session, lo: int, hi: int, shard_index: int, shard_count: int, taken_at: datetime) -> int:
+    """Upsert one snapshot per user with user_id in [lo, hi) belonging to the shard."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=PRICE_MAX_AGE)
+    holdings = db.execute(select(
+        Asset.user_id, Asset.type, Asset.quantity, Asset.buy_price, Price.price,
+    ).outerjoin(
+        Price, and_(Price.symbol == Asset.symbol, Price.type == Asset.type, Price.fetched_at >= cutoff)
+    ).where(
+        Asset.user_id >= lo,
+        Asset.user_id < hi,
+        Asset.user_id % shard_count == shard_index,
+    )).all()
+    if not holdings:
+        return 0
+    user_ids, types, quantity, buy_price, price = zip(*holdings)
+    valuation = value_holdings(quantity, buy_price, price, [asset_type in LIVE_PRICED_TYPES for asset_type in types])
+    users, totals = totals_by_user(user_ids, valuation.value)
+    period = period_start(taken_at, SNAPSHOT_GRANULARITY)
+    rows = [
+        {"user_id": int(user_id), "value": float(total), "timestamp": taken_at, "period_start": period}
+        for user_id, total in zip(users, totals)
+    ]
+    insert = dialect_insert(db)
+    for batch in chunked(rows, UPSERT_BATCH_SIZE):
+        db.execute(_on_period_conflict(insert(PortfolioSnapshot).values(batch)))
+    return len(rows)
+
+
+def take_daily_snapshots(db: Session, shard_index: int = 0, shard_count: int = 1, chunk_size: int = SNAPSHOT_CHUNK_SIZE, on_progress=None) -> int:
+    """Snapshot every user holding assets, committing one user-id range at a time."""
+    taken_at = datetime.utcnow()
+    written = 0
+    for lo, hi in _user_ranges(db, Asset.user_id, chunk_size):
+        written += _snapshot_chunk(db, lo, hi, shard_index, shard_count, taken_at)
+        db.commit()
+        if on_progress:
+            on_progress(hi, written)
+    return written
+
+
+def _thin(db: Session, lo: int, hi: int, before: datetime, unit: str) -> int:
+    """Delete all but the last snapshot per user and bucket taken before `before`."""
+    bucket = truncate_timestamp(db.get_bind().dialect.name, unit, PortfolioSnapshot.timestamp)
+    ranked = select(
+        PortfolioSnapshot.id,
+        func.row_number().over(
+            partition_by=(PortfolioSnapshot.user_id, bucket),
+            order_by=(PortfolioSnapshot.timestamp.desc(), PortfolioSnapshot.id.desc()),
+        ).label("rank"),
+    ).where(
+        PortfolioSnapshot.user_id >= lo,
+        PortfolioSnapshot.user_id < hi,
+        PortfolioSnapshot.timestamp < before,
+    ).subquery()
+    superseded = select(ranked.c.id).where(ranked.c.rank > 1)
+    return db.query(PortfolioSnapshot).filter(
+        PortfolioSnapshot.id.in_(superseded)
+    ).delete(synchronize_session=False)
+
+
+def compact_snapshots(db: Session, chunk_size: int = SNAPSHOT_CHUNK_SIZE, now=None) -> int:
+    """Roll old snapshots up into daily and then monthly points; returns the number of rows deleted."""
+    now = now or datetime.utcnow()
+    daily_before = now - timedelta(days=SNAPSHOT_RAW_RETENTION_DAYS)
+    monthly_before = now - timedelta(days=SNAPSHOT_DAILY_RETENTION_DAYS)
+    deleted = 0
+    for lo, hi in _user_ranges(db, PortfolioSnapshot.user_id, chunk_size):
+        deleted += _thin(db, lo, hi, daily_before, "day")
+        deleted += _thin(db, lo, hi, monthly_before, "month")
+        db.commit()
+    return deleted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run portfolio snapshot jobs.")
+    parser.add_argument("command", choices=["daily", "compact"])
+    parser.add_argument("--shard", type=int, default=0)
+    parser.add_argument("--shards", type=int, default=1)
+    parser.add_argument("--chunk-size", type=int, default=SNAPSHOT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "daily":
+            written = take_daily_snapshots(
+                db, args.shard, args.shards, args.chunk_size,
+                on_progress=lambda upto, total: print(f"users < {upto}: {total} snapshots"),
+            )
+            print(f"Wrote {written} snapshots.")
+        else:
+            deleted = compact_snapshots(db, args.chunk_size)
+            print(f"Removed {deleted} superseded snapshots.")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# The app reads its settings at import time, so point it at a scratch SQLite database first
+_db_dir = tempfile.mkdtemp(prefix="wealthify-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["SCHEDULER_ENABLED"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model import Base, SessionLocal, User  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        for table in reversed(Base.metadata.sorted_tables):
+            session.execute(table.delete())
+        session.commit()
+        session.close()
+
+
+@pytest.fixture
+def user(db):
+    user = User(username="tester", email="tester@example.com", password_hash="x")
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def auth_headers(user):
+    from jose import jwt
+    from main import SECRET_KEY, ALGORITHM
+
+    return {"Authorization": f"Bearer {jwt.encode({'sub': str(user.id)}, SECRET_KEY, algorithm=ALGORITHM)}"}
+
+
+@pytest.fixture
+def make_booster():
+    """Train a tiny regression booster over the given feature names."""
+    import numpy as np
+    import xgboost as xgb
+
+    def make(features, seed=0):
+        rng = np.random.default_rng(seed)
+        data = rng.uniform(0, 1000, size=(200, len(features)))
+        train = xgb.DMatrix(data, label=data.sum(axis=1) * rng.uniform(0.5, 1.5), feature_names=list(features))
+        return xgb.train({"max_depth": 3, "nthread": 1}, train, num_boost_round=5)
+
+    return make
+
+
+@pytest.fixture
+def scratch_registry(tmp_path):
+    from model_registry import ModelRegistry
+
+    return ModelRegistry(root=str(tmp_path / "models"), legacy_dir=str(tmp_path))
@@ -0,0 +1,36 @@
+from cache import DashboardCache, LRUBackend
+
+
+def test_dashboard_built_before_invalidation_is_not_served():
+    cache = DashboardCache(LRUBackend(10), ttl=300)
+    generation = cache.generation(1)
+    assert cache.get(1, generation) is None
+
+    # A write commits while the read is still building its dashboard
+    cache.invalidate(1)
+    cache.put(1, b'{"stale":true}', generation)
+
+    assert cache.get(1, cache.generation(1)) is None
+
+
+def test_dashboard_is_served_until_invalidated():
+    cache = DashboardCache(LRUBackend(10), ttl=300)
+    generation = cache.generation(1)
+    etag = cache.put(1, b'{"fresh":true}', generation)
+
+    assert cache.get(1, cache.generation(1)) == (etag, b'{"fresh":true}')
+    cache.invalidate(1)
+    assert cache.get(1, cache.generation(1)) is None
+
+
+def test_generations_share_the_lru_bound_without_repeating():
+    backend = LRUBackend(2)
+    cache = DashboardCache(backend, ttl=300)
+    generation = cache.generation(1)
+    cache.invalidate(1)
+    for user_id in range(2, 6):
+        cache.put(user_id, b"{}", cache.generation(user_id))
+
+    assert len(backend._entries) == 2
+    # User 1's counter was evicted; the recreated one must not match a generation read before
+    assert cache.generation(1) not in (0, generation)
@@ -0,0 +1,28 @@
+import io
+
+from importer import import_csv
+from model import Expense
+
+HEADER = "user_id,month,rent,loan_repayment,insurance,groceries,transport,eating_out,entertainment,utilities,healthcare,education,miscellaneous,total_expense\n"
+
+
+def _expense_line(user_id, month):
+    return f"{user_id},{month},1,1,1,1,1,1,1,1,1,1,1,11\n"
+
+
+def test_malformed_later_chunk_returns_partial_summary(db, user):
+    rows = "".join(_expense_line(user.id, f"2024-{month:02d}") for month in range(1, 5))
+    source = io.StringIO(HEADER + rows + '1,"2024-05\n')
+
+    summary = import_csv(db, source, "expenses", chunk_size=2)
+
+    assert summary["error"].startswith("Malformed CSV")
+    assert summary["written"] == 4
+    assert db.query(Expense).count() == 4
+
+
+def test_missing_columns_stop_before_writing(db, user):
+    summary = import_csv(db, io.StringIO("user_id,month\n1,2024-01\n"), "expenses")
+
+    assert summary["error"].startswith("CSV is missing required columns")
+    assert summary["written"] == 0
@@ -0,0 +1,88 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+import convert_models
+from ml_model import SAVINGS_MODEL_FEATURES
+from model_registry import BASE_DIR, ArtifactChecksumError, ModelRegistry, publish_version, read_checksum
+
+FEATURES = ["a", "b", "c"]
+
+
+def test_tampered_artifact_is_rejected(scratch_registry, make_booster):
+    version_dir = publish_version(scratch_registry.root, "expense", "v1", make_booster(FEATURES))
+    with open(os.path.join(version_dir, "model.ubj"), "r+b") as f:
+        f.seek(-2, os.SEEK_END)
+        f.write(b"\x00\x00")
+
+    with pytest.raises(ArtifactChecksumError):
+        scratch_registry.register("expense", FEATURES)
+
+
+def test_registry_versions_need_a_checksum_in_every_format(scratch_registry, make_booster):
+    version_dir = os.path.join(scratch_registry.root, "expense", "v1")
+    os.makedirs(version_dir)
+    make_booster(FEATURES).save_model(os.path.join(version_dir, "model.json"))
+    with open(os.path.join(version_dir, "metadata.json"), "w") as f:
+        json.dump({"artifact": "model.json", "format": "json"}, f)
+
+    with pytest.raises(ArtifactChecksumError):
+        scratch_registry.register("expense", FEATURES)
+
+
+def test_legacy_binary_without_checksum_falls_back_to_the_original(tmp_path, make_booster, caplog):
+    make_booster(FEATURES, seed=1).save_model(str(tmp_path / "expense_model.json"))
+    make_booster(FEATURES, seed=2).save_model(str(tmp_path / "expense_model.ubj"))
+    registry = ModelRegistry(root=str(tmp_path / "models"), legacy_dir=str(tmp_path))
+
+    registry.register("expense", FEATURES, legacy_artifact="expense_model.json")
+
+    assert registry.get("expense").metadata["artifact"].endswith("expense_model.json")
+    assert "has no .sha256 checksum" in caplog.text
+
+
+@pytest.fixture
+def legacy_dir(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(BASE_DIR, "budget_model.pkl"), tmp_path)
+    monkeypatch.setattr(convert_models, "BASE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_converted_pickle_predicts_like_the_original(legacy_dir):
+    booster, target = convert_models.convert("budget_model.pkl")
+
+    assert sorted(os.listdir(legacy_dir)) == ["budget_model.pkl", "budget_model.ubj", "budget_model.ubj.sha256"]
+    assert read_checksum(target) is not None
+    registry = ModelRegistry(root=str(legacy_dir / "models"), legacy_dir=str(legacy_dir))
+    registry.register("savings", SAVINGS_MODEL_FEATURES, legacy_artifact="budget_model.pkl")
+    assert registry.get("savings").metadata["format"] == "ubj"
+
+    original = ModelRegistry(root=str(legacy_dir / "models"), legacy_dir=str(legacy_dir))
+    os.remove(target)
+    original.register("savings", SAVINGS_MODEL_FEATURES, legacy_artifact="budget_model.pkl")
+    rows = np.random.default_rng(1).uniform(0, 100000, size=(100, len(SAVINGS_MODEL_FEATURES))).tolist()
+    assert np.array_equal(
+        registry.get("savings").predictor.predict_many(rows),
+        original.get("savings").predictor.predict_many(rows),
+    )
+
+
+def test_failed_conversion_leaves_no_files(legacy_dir, monkeypatch):
+    def differ(original, converted):
+        raise ValueError("Converted model does not reproduce the original predictions")
+
+    monkeypatch.setattr(convert_models, "_check_identical", differ)
+    with pytest.raises(ValueError):
+        convert_models.convert("budget_model.pkl")
+
+    assert os.listdir(legacy_dir) == ["budget_model.pkl"]
+
+
+def test_identity_check_catches_a_different_model(make_booster):
+    model = make_booster(FEATURES, seed=0)
+    convert_models._check_identical(model, model)
+    with pytest.raises(ValueError):
+        convert_models._check_identical(model, make_booster(FEATURES, seed=1))
@@ -0,0 +1,120 @@
+import json
+import os
+
+import pytest
+
+import main
+import ml_model
+from ml_model import EXPENSE_MODEL_FEATURES as FEATURES
+from model_registry import ModelVersionNotFound, publish_version
+
+
+@pytest.fixture
+def registry(scratch_registry, make_booster):
+    for seed, version in enumerate(["v1", "v2", "v3"]):
+        publish_version(scratch_registry.root, "expense", version, make_booster(FEATURES, seed=seed))
+    scratch_registry.register("expense", FEATURES)
+    return scratch_registry
+
+
+def test_unknown_pinned_versions_are_not_found(registry, tmp_path):
+    os.makedirs(tmp_path / "outside")
+    (tmp_path / "outside" / "metadata.json").write_text(json.dumps({"artifact": "x", "format": "pickle"}))
+
+    for version in ["v9", "../outside", "..", "v1/../v2", ""]:
+        with pytest.raises(ModelVersionNotFound):
+            registry.get("expense", version)
+    assert registry.get("expense", "v2").version == "v2"
+
+
+@pytest.fixture
+def served(registry, monkeypatch):
+    monkeypatch.setattr(main, "model_registry", registry)
+    monkeypatch.setattr(ml_model, "model_registry", registry)
+    return registry
+
+
+def _predict(client, headers, user, version=None):
+    params = {"model_version": version} if version else {}
+    body = {"items": [{"user_id": user.id, "month": "2024-01"}]}
+    return client.post("/predict-expense/batch", json=body, params=params, headers=headers)
+
+
+def test_only_admins_pin_other_versions(db, user, client, auth_headers, served):
+    assert _predict(client, auth_headers, user).headers["X-Model-Version"] == "v3"
+    assert _predict(client, auth_headers, user, "v3").status_code == 200
+    assert _predict(client, auth_headers, user, "v1").status_code == 403
+
+    user.is_admin = True
+    db.commit()
+    response = _predict(client, auth_headers, user, "v1")
+    assert response.status_code == 200
+    assert response.headers["X-Model-Version"] == "v1"
+    assert _predict(client, auth_headers, user, "v9").status_code == 404
+
+
+def test_admin_endpoints_require_admin(db, user, client, auth_headers, served):
+    assert client.get("/admin/models", headers=auth_headers).status_code == 403
+    assert client.post("/admin/models/expense/promote", json={"version": "v1"}, headers=auth_headers).status_code == 403
+    assert client.post("/admin/models/expense/rollback", headers=auth_headers).status_code == 403
+    assert served.active_version("expense") == "v3"
+
+
+def _pointer(registry):
+    with open(os.path.join(registry.root, "expense", "active.json")) as f:
+        return json.load(f)
+
+
+def test_promote_swaps_and_rollback_walks_back(registry):
+    before = registry.get("expense")
+
+    registry.promote("expense", "v1")
+    registry.promote("expense", "v2")
+
+    assert registry.get("expense").version == "v2"
+    assert before.version == "v3"  # requests holding the old version keep it
+    assert _pointer(registry) == {"version": "v2", "previous": ["v1"]}
+    assert registry.rollback("expense").version == "v1"
+    assert registry.get("expense").version == "v1"
+    with pytest.raises(ModelVersionNotFound):
+        registry.rollback("expense")
+    with pytest.raises(ModelVersionNotFound):
+        registry.promote("expense", "v9")
+
+
+def test_sync_picks_up_another_workers_promotion(registry, tmp_path):
+    from model_registry import ModelRegistry
+
+    other = ModelRegistry(root=registry.root, legacy_dir=str(tmp_path))
+    other.register("expense", FEATURES)
+    other.promote("expense", "v1")
+
+    assert registry.get("expense").version == "v3"
+    registry.sync()
+    assert registry.get("expense").version == "v1"
+
+
+def _promote_in_worker(root, legacy_dir, version):
+    from model_registry import ModelRegistry
+
+    worker = ModelRegistry(root=root, legacy_dir=legacy_dir)
+    worker.register("expense", FEATURES)
+    worker.promote("expense", version)
+
+
+def test_concurrent_promotions_keep_the_rollback_chain(registry, make_booster, tmp_path):
+    import multiprocessing
+
+    versions = [f"w{i}" for i in range(6)]
+    for version in versions:
+        publish_version(registry.root, "expense", version, make_booster(FEATURES))
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_promote_in_worker, args=(registry.root, str(tmp_path), v)) for v in versions]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    pointer = _pointer(registry)
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert sorted(pointer["previous"] + [pointer["version"]]) == versions
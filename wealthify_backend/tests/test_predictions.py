@@ -0,0 +1,64 @@
+import pytest
+
+from dates import parse_month
+from ingest import upsert_expenses
+import ml_model
+from ml_model import (
+    EXPENSE_FEATURE_COLUMNS,
+    EXPENSE_MODEL_FEATURES,
+    NOT_ENOUGH_DATA,
+    predict_expense,
+    predict_expense_batch,
+    predict_savings,
+    predict_savings_batch,
+)
+from model_registry import publish_version
+
+
+@pytest.fixture
+def expenses(db, user):
+    rows = []
+    for i, month in enumerate(["2024-01", "2024-02", "2024-03", "2024-04"]):
+        row = {column: float(10 * i + j) for j, column in enumerate(EXPENSE_FEATURE_COLUMNS)}
+        row.update(user_id=user.id, month=month, total_expense=sum(row.values()))
+        rows.append(row)
+    upsert_expenses(db, [dict(row, month_start=parse_month(row["month"])) for row in rows])
+    db.commit()
+
+
+def test_savings_batch_matches_single_predictions(db, user, expenses):
+    items = [(user.id, "2024-02", 4000.0), (user.id, "2024-04", 5500.0), (user.id, "2025-01", 3000.0), (user.id + 1, "2024-03", 100.0)]
+
+    batch = predict_savings_batch(items, db)
+
+    assert batch == [{"prediction": float(predict_savings(user_id, month, income, db))} for user_id, month, income in items]
+
+
+def test_savings_batch_reports_bad_months_per_item(db, user, expenses):
+    batch = predict_savings_batch([(user.id, "not-a-month", 1.0), (user.id, "2024-01", 1.0)], db)
+
+    assert "error" in batch[0]
+    assert "prediction" in batch[1]
+
+
+@pytest.fixture
+def expense_model(monkeypatch, scratch_registry, make_booster):
+    # The shipped expense artifact predates the lag + category feature layout, so serve a stand-in
+    publish_version(scratch_registry.root, "expense", "v1", make_booster(EXPENSE_MODEL_FEATURES))
+    scratch_registry.register("expense", EXPENSE_MODEL_FEATURES)
+    monkeypatch.setattr(ml_model, "model_registry", scratch_registry)
+
+
+def _single_expense(user_id, month, db):
+    prediction = predict_expense(user_id, month, db)
+    return prediction if isinstance(prediction, dict) else {"prediction": float(prediction)}
+
+
+def test_expense_batch_matches_single_predictions(db, user, expenses, expense_model):
+    items = [(user.id, "2024-04"), (user.id, "2024-05"), (user.id, "2024-02"), (user.id + 1, "2024-04")]
+
+    batch = predict_expense_batch(items, db)
+
+    assert batch == [_single_expense(user_id, month, db) for user_id, month in items]
+    assert "prediction" in batch[0] and "prediction" in batch[1]
+    assert batch[2] == batch[3] == {"error": NOT_ENOUGH_DATA}
@@ -0,0 +1,17 @@
+from datetime import datetime
+
+from model import PortfolioSnapshot
+from snapshots import SNAPSHOT_GRANULARITY, truncate_timestamp, upsert_snapshot
+
+
+def test_backfilled_period_matches_upserted_period(db, user):
+    upsert_snapshot(db, user.id, 100.0, taken_at=datetime(2026, 10, 17, 9, 30))
+    # What the snapshot-periods migration writes for existing rows
+    db.query(PortfolioSnapshot).update(
+        {"period_start": truncate_timestamp(db.get_bind().dialect.name, SNAPSHOT_GRANULARITY, PortfolioSnapshot.timestamp)},
+        synchronize_session=False,
+    )
+    upsert_snapshot(db, user.id, 120.0, taken_at=datetime(2026, 10, 17, 18, 0))
+    db.commit()
+
+    assert [snapshot.value for snapshot in db.query(PortfolioSnapshot)] == [120.0]
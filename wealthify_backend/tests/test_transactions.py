@@ -0,0 +1,69 @@
+from datetime import date
+
+from model import Transaction
+from pagination import NEXT_CURSOR_HEADER
+
+
+def test_keyset_pages_cover_every_transaction_once(db, user, client, auth_headers):
+    # Inserted back to back, so most rows share a created_at second
+    db.add_all(
+        Transaction(user_id=user.id, type="expense", description=f"t{i}", amount=i, category="food", date=date(2024, 1, 1))
+        for i in range(25)
+    )
+    db.commit()
+    expected = {row.id for row in db.query(Transaction.id)}
+
+    seen, cursor = [], None
+    for _ in range(len(expected)):
+        params = {"limit": 7, **({"cursor": cursor} if cursor else {})}
+        response = client.get(f"/transactions/{user.id}", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        seen += [row["id"] for row in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    assert cursor is None
+    assert sorted(seen) == sorted(expected)
+    assert len(seen) == len(set(seen))
+
+
+def test_bulk_insert_keeps_valid_rows_and_reports_invalid_ones(db, user, client, auth_headers):
+    valid = {"user_id": user.id, "type": "expense", "description": "lunch", "amount": 12.5, "category": "food", "date": "2024-03-05"}
+    payload = [
+        valid,
+        dict(valid, type="refund"),
+        dict(valid, amount="lots"),
+        dict(valid, date="05/03/2024"),
+        dict(valid, user_id=user.id + 1000),
+        dict(valid, type="income", amount=900, category="salary"),
+    ]
+
+    response = client.post("/transactions/bulk", json=payload, headers=auth_headers)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["written"] == 2
+    assert [error["index"] for error in body["errors"]] == [1, 2, 3, 4]
+    stored = db.query(Transaction).order_by(Transaction.id).all()
+    assert [(row.type, row.amount, row.date) for row in stored] == [
+        ("expense", 12.5, date(2024, 3, 5)),
+        ("income", 900.0, date(2024, 3, 5)),
+    ]
+
+
+def test_bulk_insert_accepts_ndjson(db, user, client, auth_headers):
+    line = '{"user_id": %d, "type": "expense", "description": "bus", "amount": 2, "category": "transport", "date": "2024-03-06"}' % user.id
+    response = client.post(
+        "/transactions/bulk",
+        content=f"{line}\n{line}\n",
+        headers={**auth_headers, "Content-Type": "application/x-ndjson"},
+    )
+
+    assert response.json()["written"] == 2
+
+
+def test_bulk_insert_rejects_malformed_payload(user, client, auth_headers):
+    response = client.post("/transactions/bulk", content=b"[{", headers={**auth_headers, "Content-Type": "application/json"})
+
+    assert response.status_code == 400
@@ -0,0 +1,69 @@
+"""
+Portfolio valuation.
+
+One set of rules for every caller: holdings of a live-priced type are
+valued at their market price, everything else (mutual funds, cash, and
+live assets whose quote is missing or zero) at the buy price. Holdings
+are valued as NumPy arrays in a single vectorized pass, and many users'
+portfolios are totalled at once with a bincount.
+"""
+
+from typing import NamedTuple
+import numpy as np
+
+from market_data import LIVE_PRICED_TYPES
+
+
+class Valuation(NamedTuple):
+    """Per-holding arrays; missing quantities and buy prices count as 0."""
+    quantity: np.ndarray
+    buy_price: np.ndarray
+    current_price: np.ndarray
+    value: np.ndarray
+    invested: np.ndarray
+    gain_loss: np.ndarray
+
+    @property
+    def total_value(self) -> float:
+        return float(self.value.sum())
+
+    @property
+    def invested_total(self) -> float:
+        return float(self.invested.sum())
+
+    @property
+    def total_gain_loss(self) -> float:
+        return self.total_value - self.invested_total
+
+    @property
+    def percent_change(self) -> float:
+        invested = self.invested_total
+        return self.total_gain_loss / invested * 100 if invested > 0 else 0.0
+
+
+def value_holdings(quantity, buy_price, price, live) -> Valuation:
+    """Value holdings given aligned arrays; `price` may hold NaN where no quote exists."""
+    quantity = np.nan_to_num(np.asarray(quantity, dtype=np.float64))
+    buy_price = np.nan_to_num(np.asarray(buy_price, dtype=np.float64))
+    price = np.asarray(price, dtype=np.float64)
+    priced = np.asarray(live, dtype=bool) & np.isfinite(price) & (price > 0)
+    current_price = np.where(priced, price, buy_price)
+    value = quantity * current_price
+    invested = quantity * buy_price
+    return Valuation(quantity, buy_price, current_price, value, invested, value - invested)
+
+
+def value_assets(assets, prices: dict) -> Valuation:
+    """Value Asset rows against {(symbol, type): price} as returned by market_data.load_prices."""
+    return value_holdings(
+        [asset.quantity for asset in assets],
+        [asset.buy_price for asset in assets],
+        [prices.get((str(asset.symbol), asset.type), np.nan) for asset in assets],
+        [asset.type in LIVE_PRICED_TYPES for asset in assets],
+    )
+
+
+def totals_by_user(user_ids, amounts):
+    """Sum per-holding amounts per user; returns (user_ids, totals) as aligned arrays."""
+    users, positions = np.unique(np.asarray(user_ids), return_inverse=True)
+    return users, np.bincount(positions, weights=amounts, minlength=len(users))
@@ -44,7 +44,7 @@ export default function InvestmentsPage() {
     if (token) {
       getAssets(token).then(setAssets);
       getPortfolioOverview(token).then(setOverview);
-      getPortfolioHistory(token).then(setHistory);
+      getPortfolioHistory(token, { resolution: 'daily' }).then(setHistory);
     }
   };
 
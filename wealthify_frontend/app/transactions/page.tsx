@@ -5,7 +5,7 @@ import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import { Calendar, Download, Upload, Tag, Repeat, Sparkles, Search } from "lucide-react";
 import { useAuth } from "@/context/AuthContext";
-import { transactionAPI } from "@/lib/api";
+import { transactionAPI, getNextCursor } from "@/lib/api";
 import { Dialog, DialogContent, DialogHeader, DialogTitle, DialogDescription } from "@/components/ui/dialog";
 import Papa from "papaparse";
 import { formatRupees } from '@/lib/utils';
@@ -45,6 +45,8 @@ export default function TransactionsPage() {
   const [category, setCategory] = useState("");
   const [showRecurring, setShowRecurring] = useState(false);
   const [showAllModal, setShowAllModal] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const { user } = useAuth();
 
   useEffect(() => {
@@ -54,8 +56,10 @@ export default function TransactionsPage() {
       try {
         setLoading(true);
         setError(null);
-        const response = await transactionAPI.getTransactions(parseInt(user.id), 50);
+        // Category filtering happens on the server; only one page is fetched at a time
+        const response = await transactionAPI.getTransactions(parseInt(user.id), 50, { category: category || undefined });
         setTransactions(response.data);
+        setNextCursor(getNextCursor(response));
       } catch (err) {
         console.error("Error loading transactions:", err);
         setError("Failed to load transactions");
@@ -65,14 +69,30 @@ export default function TransactionsPage() {
     };
 
     loadTransactions();
-  }, [user]);
+  }, [user, category]);
+
+  const loadMore = async () => {
+    if (!user || !nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const response = await transactionAPI.getTransactions(parseInt(user.id), 50, {
+        category: category || undefined,
+        cursor: nextCursor,
+      });
+      setTransactions(prev => [...prev, ...response.data]);
+      setNextCursor(getNextCursor(response));
+    } catch (err) {
+      console.error("Error loading more transactions:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   // Filter logic
   const filtered = transactions.filter(tx => {
     const matchesSearch = tx.description.toLowerCase().includes(search.toLowerCase()) || tx.category.toLowerCase().includes(search.toLowerCase());
-    const matchesCategory = !category || tx.category === category;
     const matchesRecurring = !showRecurring || !!tx.recurring;
-    return matchesSearch && matchesCategory && matchesRecurring;
+    return matchesSearch && matchesRecurring;
   });
 
   // Summaries
@@ -258,6 +278,11 @@ export default function TransactionsPage() {
                 </div>
               ))}
             </div>
+            {nextCursor && (
+              <Button variant="outline" onClick={loadMore} disabled={loadingMore}>
+                {loadingMore ? "Loading..." : "Load more"}
+              </Button>
+            )}
           </DialogContent>
         </Dialog>
       </div>
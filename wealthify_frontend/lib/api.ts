@@ -105,9 +105,23 @@ export const expenseAPI = {
   predictSavings: (data: PredictionRequest) => api.post('/predict/savings', data),
 };
 
+export interface TransactionFilters {
+  cursor?: string;
+  type?: string;
+  category?: string;
+  date_from?: string;
+  date_to?: string;
+  min_amount?: number;
+  max_amount?: number;
+}
+
+// Cursor for the next page of GET /transactions, or null on the last page
+export const getNextCursor = (response: { headers: Record<string, any> }): string | null =>
+  response.headers['x-next-cursor'] ?? null;
+
 export const transactionAPI = {
-  getTransactions: (userId: number, limit?: number) => 
-    api.get(`/transactions/${userId}${limit ? `?limit=${limit}` : ''}`),
+  getTransactions: (userId: number, limit?: number, filters: TransactionFilters = {}) =>
+    api.get(`/transactions/${userId}`, { params: { limit, ...filters } }),
   addTransaction: (data: TransactionRequest) => api.post('/transactions', data),
 };
 
@@ -141,9 +155,15 @@ export const getPortfolioOverview = async (token: string) => {
   return res.data;
 };
 
-export const getPortfolioHistory = async (token: string) => {
+export interface PortfolioHistoryOptions {
+  resolution?: 'raw' | 'daily' | 'weekly' | 'monthly';
+  maxPoints?: number;
+}
+
+export const getPortfolioHistory = async (token: string, options: PortfolioHistoryOptions = {}) => {
   const res = await axios.get(`${API_BASE_URL}/portfolio/history`, {
-    headers: { Authorization: `Bearer ${token}` }
+    headers: { Authorization: `Bearer ${token}` },
+    params: { resolution: options.resolution, max_points: options.maxPoints }
   });
   return res.data;
 };